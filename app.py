@@ -6,27 +6,53 @@ Processes videos and incident reports to determine consistency.
 """
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
 import tempfile
 import os
+import shutil
+import threading
+import hashlib
+from collections import OrderedDict
 import cv2
 import base64
 from io import BytesIO
 import re
 
+try:
+    import re2 as _regex  # google-re2: linear-time matching, no backtracking
+except ImportError:
+    _regex = re
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()  # SIMD libjpeg-turbo encoder
+except (ImportError, OSError, RuntimeError):
+    # Package missing or libturbojpeg shared library not found
+    _turbo_jpeg = None
+
+try:
+    import pybase64  # SIMD (SSSE3/AVX2) base64 codec
+except ImportError:
+    pybase64 = None
+
 from video_keyframe_processor import VideoKeyframeProcessor
 from text_parser import ReportProcessor
-from video_analyzer import analyze_video  # Keep for backward compatibility
+from video_analyzer import analyze_video, analyze_frames  # analyze_video kept for backward compatibility
 from scoring import score_consistency
 
 # Initialize FastAPI app
+# orjson serializes the large base64 frame payloads several times faster
+# than the stdlib json encoder
 app = FastAPI(
     title="EvidenceCheck MVP API",
     description="Video ↔ Text Consistency Checker REST API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -47,6 +73,30 @@ video_processor = VideoKeyframeProcessor(
 
 report_processor = ReportProcessor(use_handwriting_model=False)
 
+# Uploads are copied to disk in fixed-size chunks so memory stays bounded
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+
+# Uploads up to this size are written to tmpfs (RAM) when available, so the
+# video never round-trips through disk before OpenCV reads it back
+TMPFS_DIR = "/dev/shm"
+TMPFS_MAX_UPLOAD_BYTES = 256 << 20  # 256 MB
+
+# Preview frames returned in the JSON response
+PREVIEW_FRAME_LIMIT = 3
+PREVIEW_JPEG_QUALITY = 80
+
+# Max entries in the memoized claim extraction cache
+CLAIMS_CACHE_SIZE = 1024
+
+# The shared YOLO/MobileNet models are not safe to call from several threads
+# at once, so keyframe processing is serialized across requests.
+_video_processor_lock = threading.Lock()
+
+# Claims memoized by a digest of the text, so large client-supplied
+# descriptions aren't retained (same scheme as ReportProcessor._extract_fields)
+_claims_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_claims_cache_lock = threading.Lock()
+
 
 # Pydantic models for request/response
 class AnalysisRequest(BaseModel):
@@ -68,6 +118,86 @@ class HealthResponse(BaseModel):
     message: str
 
 
+# Claim extraction pattern, compiled once at import and run on lowercased
+# text. All claim types are alternatives of one pattern, so the text is
+# scanned a single time; the named group that matched tells us the claim
+# type and how to read the count. No lookarounds, so the pattern compiles
+# under both google-re2 and the stdlib re module.
+_NUMBER_WORD_ALTERNATION = 'two|three|four|five|six|seven|eight|nine|ten'
+_WEAPON_NOUNS = 'gun|knife|weapon|firearm|pistol|rifle'
+
+
+def _count_pattern(key: str, singular_nouns: str, plural_nouns: str) -> str:
+    """Alternation for "one person" / "three people" / "2 persons" phrases."""
+    return (
+        rf'(?P<{key}>'
+        rf'(?P<{key}_one>one|single|a|an)\s+(?:{singular_nouns})'
+        rf'|(?P<{key}_word>{_NUMBER_WORD_ALTERNATION})\s+(?:{plural_nouns})'
+        rf'|(?P<{key}_num>\d+)\s+(?:{plural_nouns})'
+        r')'
+    )
+
+
+# A single scan can't return overlapping matches, so "no gun present" gets its
+# own presence alternative: otherwise "no gun" would consume the noun and
+# hide "gun present" (presence wins over absence)
+_CLAIM_RE = _regex.compile(
+    r'\b(?:'
+    + _count_pattern(
+        'people',
+        'person|people|individual|man|woman|pedestrian',
+        'people|persons|individuals|men|women|pedestrians'
+    )
+    + '|' + _count_pattern(
+        'cars',
+        'car|vehicle|auto|sedan|suv|truck|van',
+        'cars|vehicles|autos|sedans|suvs|trucks|vans'
+    )
+    + rf'|(?P<weapon_negated_present>(?:no|without)\s+(?:{_WEAPON_NOUNS})'
+    + r'\s+(?:present|visible|seen|detected|shown))'
+    + rf'|(?P<weapon_absent>no\s+(?:{_WEAPON_NOUNS})|(?:no|without)\s+weapons?)'
+    + rf'|(?P<weapon_present>(?:{_WEAPON_NOUNS})\s+(?:present|visible|seen|detected|shown)'
+    + rf'|(?:a|an|the)\s+(?:{_WEAPON_NOUNS}))'
+    r')\b'
+)
+
+# Substrings that every claim match contains. A plain `in` check is much
+# cheaper than a regex scan, so texts mentioning none of them skip it.
+_CLAIM_KEYWORDS = (
+    "person", "people", "individual", "man", "men", "pedestrian",
+    "car", "vehicle", "auto", "sedan", "suv", "truck", "van",
+    "gun", "knife", "weapon", "firearm", "pistol", "rifle"
+)
+
+_NUMBER_WORDS = {
+    'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+
+_COUNT_FORMS = ('one', 'word', 'num')
+
+
+def _resolve_count(first_matches: Dict[str, str]) -> Optional[int]:
+    """
+    Count for one claim kind from the earliest match of each phrase form.
+    A singular phrase ("a person") wins over a number word ("three people"),
+    which wins over digits ("3 people"), wherever each occurs in the text.
+    """
+    singular = first_matches.get('one')
+    # Only the earliest singular phrase is considered; a separator other than
+    # a plain space after "a"/"an" makes it fall through to the other forms
+    if singular is not None and singular.startswith(('one', 'single', 'a ', 'an ')):
+        return 1
+    word = first_matches.get('word')
+    if word is not None:
+        return _NUMBER_WORDS[word]
+    num_str = first_matches.get('num')
+    if num_str is not None:
+        return int(num_str)
+    return None
+
+
 def extract_claims_from_text(text: str) -> Dict[str, Any]:
     """
     Extract claims (people, cars, weapons) from text description.
@@ -80,93 +210,66 @@ def extract_claims_from_text(text: str) -> Dict[str, Any]:
     Returns:
         Dictionary with people, cars, weapon_present (each can be None)
     """
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    with _claims_cache_lock:
+        claims = _claims_cache.get(key)
+        if claims is not None:
+            _claims_cache.move_to_end(key)
+            # Copy so callers can't mutate the cached entry
+            return dict(claims)
+    
+    claims = _extract_claims(text)
+    
+    with _claims_cache_lock:
+        _claims_cache[key] = claims
+        if len(_claims_cache) > CLAIMS_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+    return dict(claims)
+
+
+def _extract_claims(text: str) -> Dict[str, Any]:
+    """Claim extraction proper (a pure function of the text)."""
     claims = {
         "people": None,
         "cars": None,
         "weapon_present": None
     }
     
+    # Lowercased once for the keyword prefilter and the regex
     text_lower = text.lower()
+    if not any(keyword in text_lower for keyword in _CLAIM_KEYWORDS):
+        return claims
     
-    # Extract people count
-    # Patterns: "three people", "2 persons", "one person", etc.
-    people_patterns = [
-        r'\b(?:one|single|a|an)\s+(?:person|people|individual|man|woman|pedestrian)\b',
-        r'\b(two|three|four|five|six|seven|eight|nine|ten)\s+(?:people|persons|individuals|men|women|pedestrians)\b',
-        r'\b(\d+)\s+(?:people|persons|individuals|men|women|pedestrians)\b'
-    ]
-    
-    for pattern in people_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            if match.group(0).startswith(('one', 'single', 'a ', 'an ')):
-                claims["people"] = 1
-                break
-            else:
-                # Try to extract number
-                number_words = {
-                    'two': 2, 'three': 3, 'four': 4, 'five': 5,
-                    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
-                }
-                if len(match.groups()) > 0:
-                    num_str = match.group(1)
-                    if num_str.isdigit():
-                        claims["people"] = int(num_str)
-                    elif num_str in number_words:
-                        claims["people"] = number_words[num_str]
-                    break
-    
-    # Extract cars/vehicles count
-    # Patterns: "two cars", "1 vehicle", "three vehicles", etc.
-    vehicle_patterns = [
-        r'\b(?:one|single|a|an)\s+(?:car|vehicle|auto|sedan|suv|truck|van)\b',
-        r'\b(two|three|four|five|six|seven|eight|nine|ten)\s+(?:cars|vehicles|autos|sedans|suvs|trucks|vans)\b',
-        r'\b(\d+)\s+(?:cars|vehicles|autos|sedans|suvs|trucks|vans)\b'
-    ]
+    weapon_present = False
+    weapon_absent = False
+    # Earliest match text of each phrase form, per claim kind
+    first_matches: Dict[str, Dict[str, str]] = {"people": {}, "cars": {}}
     
-    for pattern in vehicle_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            if match.group(0).startswith(('one', 'single', 'a ', 'an ')):
-                claims["cars"] = 1
-                break
-            else:
-                number_words = {
-                    'two': 2, 'three': 3, 'four': 4, 'five': 5,
-                    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
-                }
-                if len(match.groups()) > 0:
-                    num_str = match.group(1)
-                    if num_str.isdigit():
-                        claims["cars"] = int(num_str)
-                    elif num_str in number_words:
-                        claims["cars"] = number_words[num_str]
+    # Single pass over the text
+    # Patterns: "three people", "2 persons", "one person", "two cars",
+    # "1 vehicle", "gun present", "no weapon", "weapon visible", etc.
+    for match in _CLAIM_RE.finditer(text_lower):
+        if match.group('weapon_present') is not None or match.group('weapon_negated_present') is not None:
+            weapon_present = True
+        elif match.group('weapon_absent') is not None:
+            weapon_absent = True
+        else:
+            key = "people" if match.group('people') is not None else "cars"
+            for form in _COUNT_FORMS:
+                value = match.group(f'{key}_{form}')
+                if value is not None:
+                    # The singular form is checked on the whole phrase
+                    first_matches[key].setdefault(form, match.group(key) if form == 'one' else value)
                     break
     
-    # Extract weapon presence
-    # Patterns: "gun present", "no weapon", "weapon visible", etc.
-    weapon_present_patterns = [
-        r'\b(?:gun|knife|weapon|firearm|pistol|rifle)\s+(?:present|visible|seen|detected|shown)\b',
-        r'\b(?:a|an|the)\s+(?:gun|knife|weapon|firearm|pistol|rifle)\b'
-    ]
-    
-    weapon_absent_patterns = [
-        r'\bno\s+(?:gun|knife|weapon|firearm|pistol|rifle)\b',
-        r'\b(?:no|without)\s+weapons?\b'
-    ]
-    
-    # Check for weapon presence
-    for pattern in weapon_present_patterns:
-        if re.search(pattern, text_lower):
-            claims["weapon_present"] = True
-            break
+    claims["people"] = _resolve_count(first_matches["people"])
+    claims["cars"] = _resolve_count(first_matches["cars"])
     
-    # Check for weapon absence (only if not already set to True)
-    if claims["weapon_present"] is None:
-        for pattern in weapon_absent_patterns:
-            if re.search(pattern, text_lower):
-                claims["weapon_present"] = False
-                break
+    # Absence only counts when presence wasn't established anywhere
+    if weapon_present:
+        claims["weapon_present"] = True
+    elif weapon_absent:
+        claims["weapon_present"] = False
     
     return claims
 
@@ -174,7 +277,8 @@ def extract_claims_from_text(text: str) -> Dict[str, Any]:
 def convert_keyframe_results_to_video_stats(keyframe_results: Dict[str, Any]) -> Dict[str, Any]:
     """
     Convert VideoKeyframeProcessor results to format compatible with scoring.py.
-    Uses video_analyzer for people/cars/weapons detection.
+    People/cars/weapons counts come from the YOLO results the keyframe
+    processor already computed, so the video is only decoded once.
     
     Args:
         keyframe_results: Results from VideoKeyframeProcessor.process_video()
@@ -182,28 +286,17 @@ def convert_keyframe_results_to_video_stats(keyframe_results: Dict[str, Any]) ->
     Returns:
         Dictionary with people, cars, weapon_present, frames
     """
-    # We still need to use video_analyzer for people/cars/weapons counts
-    # VideoKeyframeProcessor focuses on collision detection and severity
-    # So we'll combine both approaches
-    
-    # For now, use video_analyzer to get people/cars/weapons
-    # In the future, we could enhance VideoKeyframeProcessor to also count these
+    yolo_results = keyframe_results.get('yolo_results')
     video_path = keyframe_results.get('video_path')
     
-    if video_path and os.path.exists(video_path):
-        # Use existing video_analyzer for object detection
+    if yolo_results is not None:
+        # Reuse the keyframe detections (no second decode / inference pass)
+        video_stats = analyze_frames(yolo_results)
+    elif video_path and os.path.exists(video_path):
+        # Processor ran without keep_yolo_results; analyze the video directly
         video_stats = analyze_video(video_path)
-        
-        # Add keyframe processor results
-        video_stats['collision_detected'] = keyframe_results.get('collision_detected', False)
-        video_stats['collision_timestamp'] = keyframe_results.get('T_actual')
-        video_stats['collision_confidence'] = keyframe_results.get('collision_confidence', 0.0)
-        video_stats['severity'] = keyframe_results.get('severity_actual')
-        video_stats['severity_confidence'] = keyframe_results.get('severity_confidence', 0.0)
-        
-        return video_stats
     else:
-        # Fallback if video path not available
+        # Fallback if neither detections nor video path are available
         return {
             "people": 0,
             "cars": 0,
@@ -213,6 +306,61 @@ def convert_keyframe_results_to_video_stats(keyframe_results: Dict[str, Any]) ->
             "collision_timestamp": keyframe_results.get('T_actual'),
             "severity": keyframe_results.get('severity_actual')
         }
+    
+    # Add keyframe processor results
+    video_stats['collision_detected'] = keyframe_results.get('collision_detected', False)
+    video_stats['collision_timestamp'] = keyframe_results.get('T_actual')
+    video_stats['collision_confidence'] = keyframe_results.get('collision_confidence', 0.0)
+    video_stats['severity'] = keyframe_results.get('severity_actual')
+    video_stats['severity_confidence'] = keyframe_results.get('severity_confidence', 0.0)
+    
+    return video_stats
+
+
+def _upload_tmp_dir(upload_size: Optional[int]) -> Optional[str]:
+    """
+    Pick the directory for an uploaded video's temp file: tmpfs for small
+    uploads when it has room, otherwise None (the default temp dir).
+    """
+    if upload_size is None or upload_size > TMPFS_MAX_UPLOAD_BYTES:
+        return None
+    try:
+        # Leave headroom; e.g. Docker's default /dev/shm is only 64 MB
+        if shutil.disk_usage(TMPFS_DIR).free > 2 * upload_size:
+            return TMPFS_DIR
+    except OSError:
+        # No tmpfs on this platform
+        pass
+    return None
+
+
+def _run_keyframe_processor(video_path: str) -> Dict[str, Any]:
+    """Run the shared VideoKeyframeProcessor on a video file."""
+    with _video_processor_lock:
+        return video_processor.process_video(
+            video_path=video_path,
+            output_dir=None,  # Don't save keyframes for API
+            keep_yolo_results=True
+        )
+
+
+def _run_video_pipeline(video_path: str, use_keyframe_processor: bool) -> Dict[str, Any]:
+    """Analyze a video file and return stats in the format scoring.py expects."""
+    if use_keyframe_processor:
+        # Use new VideoKeyframeProcessor
+        keyframe_results = _run_keyframe_processor(video_path)
+        
+        # Convert to format compatible with scoring
+        return convert_keyframe_results_to_video_stats(keyframe_results)
+    
+    # Use legacy video_analyzer
+    return analyze_video(video_path)
+
+
+def _run_text_pipeline(text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Extract claims and ReportProcessor time/severity data from text."""
+    # Repeated reports hit ReportProcessor's digest-keyed field cache
+    return extract_claims_from_text(text), report_processor.process_report(text, is_image_path=False)
 
 
 def frame_to_base64(frame: Any) -> Optional[str]:
@@ -220,13 +368,32 @@ def frame_to_base64(frame: Any) -> Optional[str]:
     try:
         if frame is None:
             return None
-        _, buffer = cv2.imencode('.jpg', frame)
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
+        if _turbo_jpeg is not None:
+            buffer = _turbo_jpeg.encode(
+                frame, quality=PREVIEW_JPEG_QUALITY, pixel_format=TJPF_BGR
+            )
+        else:
+            _, buffer = cv2.imencode(
+                '.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY]
+            )
+        if pybase64 is not None:
+            return pybase64.b64encode_as_string(buffer)
+        frame_base64 = base64.b64encode(buffer).decode('ascii')
         return frame_base64
     except Exception:
         return None
 
 
+def frames_to_base64(frames: List[Any], limit: int = PREVIEW_FRAME_LIMIT) -> List[str]:
+    """Encode up to `limit` frames, skipping any that fail to encode."""
+    frames_base64 = []
+    for frame in frames[:limit]:
+        frame_b64 = frame_to_base64(frame)
+        if frame_b64:
+            frames_base64.append(frame_b64)
+    return frames_base64
+
+
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Root endpoint - health check."""
@@ -245,7 +412,9 @@ async def health_check():
     }
 
 
-@app.post("/analyze", response_model=AnalysisResponse)
+# The response is built internally, so it is returned as-is instead of being
+# revalidated through AnalysisResponse; the model only documents the schema.
+@app.post("/analyze", responses={200: {"model": AnalysisResponse}})
 async def analyze_consistency(
     video: UploadFile = File(..., description="Video file to analyze"),
     text_description: str = Form(..., description="Text description of the incident"),
@@ -260,7 +429,7 @@ async def analyze_consistency(
         use_keyframe_processor: Whether to use new VideoKeyframeProcessor or legacy video_analyzer
         
     Returns:
-        AnalysisResponse with consistency score and details
+        AnalysisResponse-shaped JSON with consistency score and details
     """
     tmp_path = None
     
@@ -282,38 +451,30 @@ async def analyze_consistency(
             raise HTTPException(status_code=400, detail="Text description is required")
         
         # Save uploaded video to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-            content = await video.read()
-            tmp.write(content)
+        with tempfile.NamedTemporaryFile(
+            delete=False, suffix=file_ext, buffering=UPLOAD_CHUNK_SIZE,
+            dir=_upload_tmp_dir(video.size)
+        ) as tmp:
             tmp_path = tmp.name
+            while chunk := await video.read(UPLOAD_CHUNK_SIZE):
+                tmp.write(chunk)
         
-        # Extract claims from text
-        claims = extract_claims_from_text(text_description)
-        
-        # Process video
-        if use_keyframe_processor:
-            # Use new VideoKeyframeProcessor
-            keyframe_results = video_processor.process_video(
-                video_path=tmp_path,
-                output_dir=None  # Don't save keyframes for API
-            )
-            
-            # Convert to format compatible with scoring
-            video_stats = convert_keyframe_results_to_video_stats(keyframe_results)
-        else:
-            # Use legacy video_analyzer
-            video_stats = analyze_video(tmp_path)
+        # Process video and text concurrently
+        # Decoding and inference are blocking, so both pipelines run in the
+        # threadpool; the text work finishes while the video is decoding and
+        # the event loop stays free for other requests.
+        video_stats, (claims, report_data) = await asyncio.gather(
+            run_in_threadpool(_run_video_pipeline, tmp_path, use_keyframe_processor),
+            run_in_threadpool(_run_text_pipeline, text_description)
+        )
         
         # Calculate consistency score
         result = score_consistency(claims, video_stats)
         
         # Convert frames to base64 for JSON response
-        frames_base64 = []
-        frames = video_stats.get("frames", [])
-        for frame in frames[:3]:  # Limit to 3 frames
-            frame_b64 = frame_to_base64(frame)
-            if frame_b64:
-                frames_base64.append(frame_b64)
+        frames_base64 = await run_in_threadpool(
+            frames_to_base64, video_stats.get("frames", [])
+        )
         
         # Prepare video analysis summary
         video_analysis_summary = {
@@ -342,34 +503,33 @@ async def analyze_consistency(
             "raw_text_snippet": text_description[:100] + "..." if len(text_description) > 100 else text_description
         }
         
-        # Process report using ReportProcessor for time/severity extraction
-        report_data = report_processor.process_report(text_description, is_image_path=False)
+        # Add ReportProcessor time/severity extraction
         if report_data and "error" not in report_data:
             text_claims_summary.update({
                 "time_seconds": report_data.get("TReport"),
                 "severity_report": report_data.get("SeverityReport")
             })
         
-        return AnalysisResponse(
-            success=True,
-            consistency_score=result["score"],
-            details=result["details"],
-            video_analysis=video_analysis_summary,
-            text_claims=text_claims_summary,
-            error=None
-        )
+        return ORJSONResponse(content={
+            "success": True,
+            "consistency_score": result["score"],
+            "details": result["details"],
+            "video_analysis": video_analysis_summary,
+            "text_claims": text_claims_summary,
+            "error": None
+        })
     
     except HTTPException:
         raise
     except Exception as e:
-        return AnalysisResponse(
-            success=False,
-            consistency_score=0,
-            details=[],
-            video_analysis={},
-            text_claims={},
-            error=str(e)
-        )
+        return ORJSONResponse(content={
+            "success": False,
+            "consistency_score": 0,
+            "details": [],
+            "video_analysis": {},
+            "text_claims": {},
+            "error": str(e)
+        })
     finally:
         # Clean up temporary file
         if tmp_path and os.path.exists(tmp_path):
@@ -394,11 +554,10 @@ async def analyze_text_only(
         if not text_description or not text_description.strip():
             raise HTTPException(status_code=400, detail="Text description is required")
         
-        # Extract claims using regex patterns
-        claims = extract_claims_from_text(text_description)
-        
-        # Process report using ReportProcessor
-        report_data = report_processor.process_report(text_description, is_image_path=False)
+        # Extract claims using regex patterns and process report using
+        # ReportProcessor, off the event loop so long reports don't block
+        # other requests
+        claims, report_data = await run_in_threadpool(_run_text_pipeline, text_description)
         
         return {
             "success": True,
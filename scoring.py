@@ -5,13 +5,39 @@ This module compares extracted text data (NLP) against video analysis data (CV).
 It calculates a consistency score based on Time Difference and Severity Matching.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # --- CONFIGURATION ---
 TIME_THRESHOLD_SECONDS = 5  # Allowable margin of error for timestamp
 SCORE_WEIGHT_TIME = 50      # Points awarded for matching time
 SCORE_WEIGHT_SEVERITY = 50  # Points awarded for matching severity
 
+# Response when the CV model found no collision (the common early-out).
+# Built once; score_consistency hands out copies so callers may mutate them.
+_NO_COLLISION_DETAIL = {
+    "claim_type": "Event Existence",
+    "claim_value": "Accident Reported",
+    "video_value": "No Collision Detected",
+    "result": "FAIL",
+    "note": "The AI could not find a crash in the footage."
+}
+_NO_COLLISION_RESPONSE = {
+    "score": 0,
+    "status": "NO COLLISION DETECTED IN VIDEO",
+    "details": [_NO_COLLISION_DETAIL]
+}
+
+def _normalize_severity(value: Any) -> str:
+    """Casefolded, stripped severity label; a missing value counts as "unknown"."""
+    return "unknown" if value is None else str(value).casefold().strip()
+
 def score_consistency(nlp_data: Dict[str, Any], cv_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Audits the consistency between the Written Report and Video Evidence.
@@ -36,17 +62,7 @@ def score_consistency(nlp_data: Dict[str, Any], cv_data: Dict[str, Any]) -> Dict
     collision_detected = cv_data.get("Collision_Detected", False)
     
     if not collision_detected:
-        return {
-            "score": 0,
-            "status": "NO COLLISION DETECTED IN VIDEO",
-            "details": [{
-                "claim_type": "Event Existence",
-                "claim_value": "Accident Reported",
-                "video_value": "No Collision Detected",
-                "result": "FAIL",
-                "note": "The AI could not find a crash in the footage."
-            }]
-        }
+        return {**_NO_COLLISION_RESPONSE, "details": [dict(_NO_COLLISION_DETAIL)]}
 
     # --- 2. AUDIT: TIME CONSISTENCY ---
     t_report = nlp_data.get("TReport", -1)
@@ -83,8 +99,8 @@ def score_consistency(nlp_data: Dict[str, Any], cv_data: Dict[str, Any]) -> Dict
     })
 
     # --- 3. AUDIT: SEVERITY CONSISTENCY ---
-    sev_report = str(nlp_data.get("SeverityReport", "Unknown")).lower().strip()
-    sev_actual = str(cv_data.get("Severity_Actual", "Unknown")).lower().strip()
+    sev_report = _normalize_severity(nlp_data.get("SeverityReport"))
+    sev_actual = _normalize_severity(cv_data.get("Severity_Actual"))
     sev_status = "FAIL"
     sev_note = ""
 
@@ -114,4 +130,89 @@ def score_consistency(nlp_data: Dict[str, Any], cv_data: Dict[str, Any]) -> Dict
         "score": total_score,
         "status": "COMPLETE",
         "details": details
-    }
\ No newline at end of file
+    }
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _score_kernel(t_report, t_actual, sev_report, sev_actual, collision, out):
+        """Fused per-row scoring; severities are integer codes, -1 = unknown."""
+        for i in prange(t_report.shape[0]):
+            if not collision[i]:
+                out[i] = 0
+                continue
+            score = 0
+            if (t_report[i] != -1 and t_actual[i] != -1
+                    and abs(t_report[i] - t_actual[i]) <= TIME_THRESHOLD_SECONDS):
+                score += SCORE_WEIGHT_TIME
+            if sev_report[i] != -1 and sev_report[i] == sev_actual[i]:
+                score += SCORE_WEIGHT_SEVERITY
+            out[i] = score
+else:
+    _score_kernel = None
+
+
+def _encode_severities(sev_report: Sequence[str], sev_actual: Sequence[str]):
+    """Map normalized severity strings to shared int codes ("unknown" -> -1)."""
+    codes = {"unknown": -1}
+
+    def encode(values):
+        return np.fromiter(
+            (codes.setdefault(_normalize_severity(v), len(codes) - 1) for v in values),
+            dtype=np.int32, count=len(values)
+        )
+
+    return encode(sev_report), encode(sev_actual)
+
+
+def score_consistency_batch(
+    t_report: Sequence[float],
+    t_actual: Sequence[float],
+    sev_report: Sequence[str],
+    sev_actual: Sequence[str],
+    collision: Sequence[bool]
+) -> np.ndarray:
+    """
+    Scores many (report, video) pairs at once with vectorized NumPy ops.
+    Applies the same rules as score_consistency, without building detail rows.
+
+    Args:
+        t_report: Reported impact times in seconds (-1 = not found).
+        t_actual: Video impact times in seconds (-1 = not calculated).
+        sev_report: Reported severities ("Unknown" = not found).
+        sev_actual: Video severities ("Unknown" = not determined).
+        collision: Whether the CV model detected a collision.
+
+    Returns:
+        int64 array of scores (0-100), one per pair, with or without numba.
+    """
+    t_report = np.asarray(t_report, dtype=np.float64)
+    t_actual = np.asarray(t_actual, dtype=np.float64)
+    collision = np.asarray(collision, dtype=bool)
+
+    if _score_kernel is not None:
+        # Numba: one fused pass over the rows, no intermediate arrays
+        sev_report_codes, sev_actual_codes = _encode_severities(sev_report, sev_actual)
+        scores = np.zeros(t_report.shape[0], dtype=np.int64)
+        _score_kernel(t_report, t_actual, sev_report_codes, sev_actual_codes, collision, scores)
+        return scores
+
+    # --- TIME: both known and within tolerance ---
+    time_match = (
+        (t_report != -1)
+        & (t_actual != -1)
+        & (np.abs(t_report - t_actual) <= TIME_THRESHOLD_SECONDS)
+    )
+
+    # --- SEVERITY: both known and equal (case/whitespace-insensitive) ---
+    sev_report = np.array([_normalize_severity(v) for v in sev_report], dtype=str)
+    sev_actual = np.array([_normalize_severity(v) for v in sev_actual], dtype=str)
+    sev_match = (sev_report != "unknown") & (sev_report == sev_actual)
+
+    scores = (
+        np.where(time_match, SCORE_WEIGHT_TIME, 0)
+        + np.where(sev_match, SCORE_WEIGHT_SEVERITY, 0)
+    )
+    # No collision detected means nothing could be verified. np.where's
+    # default int is platform-dependent, so pin the dtype the kernel uses
+    return np.where(collision, scores, 0).astype(np.int64)
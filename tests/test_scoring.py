@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+import scoring
+
+
+BATCH = dict(
+    t_report=[120, 120, -1, 10],
+    t_actual=[121, 300, 5, 10],
+    sev_report=["Severe", "minor ", "Unknown", None],
+    sev_actual=["severe", "Minor", "Unknown", "Moderate"],
+    collision=[True, True, True, False],
+)
+
+
+# Expected scores for BATCH: time and severity match; severity only;
+# unknown severity and time; no collision
+EXPECTED_SCORES = [100, 50, 0, 0]
+
+
+def _numpy_batch_scores():
+    """score_consistency_batch with the numba kernel disabled."""
+    kernel = scoring._score_kernel
+    scoring._score_kernel = None
+    try:
+        return scoring.score_consistency_batch(**BATCH)
+    finally:
+        scoring._score_kernel = kernel
+
+
+def _scalar_scores():
+    """score_consistency on each row of BATCH."""
+    return [
+        scoring.score_consistency(
+            {"TReport": t_report, "SeverityReport": sev_report},
+            {"T_Actual": t_actual, "Severity_Actual": sev_actual, "Collision_Detected": collision},
+        )["score"]
+        for t_report, t_actual, sev_report, sev_actual, collision in zip(
+            BATCH["t_report"], BATCH["t_actual"], BATCH["sev_report"],
+            BATCH["sev_actual"], BATCH["collision"]
+        )
+    ]
+
+
+class ScoreConsistencyBatchValuesTest(unittest.TestCase):
+    """The NumPy path scores like the scalar score_consistency."""
+
+    def test_numpy_path_scores(self):
+        self.assertEqual(_numpy_batch_scores().tolist(), EXPECTED_SCORES)
+
+    def test_numpy_path_matches_scalar(self):
+        self.assertEqual(_numpy_batch_scores().tolist(), _scalar_scores())
+
+    @unittest.skipIf(scoring._score_kernel is None, "numba not installed")
+    def test_numba_path_scores(self):
+        self.assertEqual(scoring.score_consistency_batch(**BATCH).tolist(), EXPECTED_SCORES)
+
+
+class ScoreConsistencyBatchDtypeTest(unittest.TestCase):
+    """score_consistency_batch returns int64 whichever path computes it."""
+
+    def test_numpy_path_returns_int64(self):
+        self.assertEqual(_numpy_batch_scores().dtype, np.int64)
+
+    @unittest.skipIf(scoring._score_kernel is None, "numba not installed")
+    def test_numba_path_returns_int64(self):
+        scores = scoring.score_consistency_batch(**BATCH)
+        self.assertEqual(scores.dtype, np.int64)
+
+    @unittest.skipIf(scoring._score_kernel is None, "numba not installed")
+    def test_paths_agree(self):
+        np.testing.assert_array_equal(scoring.score_consistency_batch(**BATCH), _numpy_batch_scores())
+
+
+if __name__ == "__main__":
+    unittest.main()
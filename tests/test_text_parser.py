@@ -0,0 +1,83 @@
+import unittest
+
+from text_parser import HandwritingEngine
+
+try:
+    import torch
+    from transformers import (
+        TrOCRConfig,
+        ViTConfig,
+        VisionEncoderDecoderConfig,
+        VisionEncoderDecoderModel,
+    )
+except ImportError:
+    torch = None
+
+
+VOCAB_SIZE = 24
+MAX_LENGTH = 12
+
+
+def _tiny_engine():
+    """HandwritingEngine around a small randomly initialized TrOCR-style model."""
+    encoder = ViTConfig(
+        image_size=32, patch_size=8, num_channels=3, hidden_size=32,
+        num_hidden_layers=1, num_attention_heads=2, intermediate_size=64
+    )
+    decoder = TrOCRConfig(
+        vocab_size=VOCAB_SIZE, d_model=32, decoder_layers=1,
+        decoder_attention_heads=2, decoder_ffn_dim=64, max_position_embeddings=64,
+        bos_token_id=0, pad_token_id=1, eos_token_id=2, decoder_start_token_id=2
+    )
+    torch.manual_seed(0)
+    model = VisionEncoderDecoderModel(
+        config=VisionEncoderDecoderConfig.from_encoder_decoder_configs(encoder, decoder)
+    ).eval()
+    model.generation_config.decoder_start_token_id = 2
+    model.generation_config.pad_token_id = 1
+    model.generation_config.max_length = MAX_LENGTH
+
+    engine = HandwritingEngine.__new__(HandwritingEngine)
+    engine.model = model
+    engine.torch = torch
+    return engine
+
+
+@unittest.skipIf(torch is None, "torch/transformers not installed")
+class EarlyExitDecodingTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = _tiny_engine()
+        generator = torch.Generator().manual_seed(0)
+        self.pixel_values = torch.randn(6, 3, 32, 32, generator=generator)
+
+    def test_matches_generate(self):
+        # A random model emits each token at different steps in different
+        # rows, so trying every id as EOS covers rows finishing early, late,
+        # and not at all
+        config = self.engine.model.generation_config
+        for eos_id in range(VOCAB_SIZE):
+            with self.subTest(eos_id=eos_id):
+                config.eos_token_id = eos_id
+                with torch.inference_mode():
+                    expected = self.engine.model.generate(self.pixel_values)
+                    actual = self.engine._generate_early_exit(
+                        self.pixel_values, *self.engine._special_token_ids()
+                    )
+                self.assertTrue(torch.equal(actual, expected))
+
+    def test_only_used_for_plain_greedy_configs(self):
+        config = self.engine.model.generation_config
+        self.assertTrue(self.engine._early_exit_supported())
+        for name, value in (("num_beams", 4), ("no_repeat_ngram_size", 3),
+                            ("repetition_penalty", 1.2), ("max_new_tokens", 8)):
+            with self.subTest(setting=name):
+                default = getattr(config, name)
+                setattr(config, name, value)
+                try:
+                    self.assertFalse(self.engine._early_exit_supported())
+                finally:
+                    setattr(config, name, default)
+
+
+if __name__ == "__main__":
+    unittest.main()
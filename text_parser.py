@@ -1,70 +1,326 @@
+import io
+import os
 import re
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, List, Union
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("NLPProcessor")
 
+try:
+    import re2 as _regex  # google-re2: linear-time matching, no backtracking
+except ImportError:
+    _regex = re
+
+# --- PRECOMPILED PATTERNS ---
+# Patterns stick to the syntax shared by google-re2 and the stdlib re module
+# (no flag arguments), since OCR output is untrusted input.
+
+# Labeled time fields (Contextual Search) and standalone times (General Search)
+# in one pattern, so a single scan finds both.
+# The contextual branch matches digits OR common OCR letter-errors (O, I, l, S, etc.)
+# This allows us to catch "Time: l0:30" and pass it to the cleaner logic.
+# It is case-insensitive via explicit [Xx] classes rather than a flag, which saves
+# the engine per-character case folding.
+# The general branch is slightly stricter (and case-sensitive) to avoid false
+# positives, but allows basic O/I errors.
+_TIME_RE = _regex.compile(
+    r"(?:[Tt][Ii][Mm][Ee]|[Aa][Tt])[:\s\.]*(?P<ctx>[0-9OoQqLlIiZzSs]{1,2}\s*[:\.]\s*[0-9OoQqLlIiZzSs]{2})"
+    r"(?:\s*[:\.]\s*[0-9OoQqLlIiZzSs]{2})?\s*(?P<ampm>[AaPp][Mm])?"
+    r"|\b(?P<gen>[0-9OQlI]{1,2}:[0-9OQlI]{2}(?::[0-9OQlI]{2})?)\b"
+)
+
+# --- Expanded OCR Error Correction for Time ---
+# OCR often confuses letters with numbers.
+# We apply these replacements to sanitize the input.
+_OCR_DIGIT_TABLE = str.maketrans({
+    "O": "0", "o": "0", "Q": "0", "D": "0",  # Zero-likes
+    "I": "1", "l": "1", "L": "1", "|": "1",  # One-likes
+    "Z": "2",                                # Two-likes
+    "S": "5", "s": "5",                      # Five-likes
+    "B": "8",                                # Eight-likes
+    "G": "6"                                 # Six-likes
+})
+
+# --- Comprehensive OCR/Spelling Correction Map ---
+# Maps misread word -> corrected word (applied to lowercased text)
+# Covers substitutions, truncations, and visual mimicry
+_OCR_FIX_MAP = {
+    # Severe: v->u, v->y, e->c, truncations
+    'sever': 'severe',
+    'sevre': 'severe',
+    'svere': 'severe',
+    'seyere': 'severe',
+    '5evere': 'severe',
+    'severc': 'severe',
+    'sevcre': 'severe',
+    
+    # Fatal: l->1, l->I, t->f, l->i ('fataI' lowercases to 'fatai')
+    'fata1': 'fatal',
+    'fatai': 'fatal',
+    'fatsl': 'fatal',
+    
+    # Minor: o->c, o->a, m->rn, n->m, i->l
+    'mincr': 'minor',
+    'minar': 'minor',
+    'rninor': 'minor', # 'rn' looks like 'm'
+    'mlnor': 'minor',
+    'ninor': 'minor',  # 'n' looks like 'm'
+    'mimor': 'minor',
+    
+    # Moderate: d->b, ate->8, n->m
+    'moberate': 'moderate', # 'b' looks like 'd'
+    'noderate': 'moderate',
+    'modr8': 'moderate',
+    'modrate': 'moderate'
+}
+
+# All fixes as one alternation so the text is scanned once, not once per fix
+_OCR_FIX_RE = _regex.compile(
+    r'\b(' + '|'.join(re.escape(word) for word in sorted(_OCR_FIX_MAP, key=len, reverse=True)) + r')\b'
+)
+
+# --- LAZY OPTIONAL IMPORTS ---
+# Resolved on first use and cached, so constructing engines/processors repeatedly
+# doesn't redo the import machinery. A failed import raises ImportError as usual.
+
+@lru_cache(maxsize=1)
+def _get_pil_image():
+    from PIL import Image
+    return Image
+
+@lru_cache(maxsize=1)
+def _get_tesserocr():
+    import tesserocr
+    return tesserocr
+
+@lru_cache(maxsize=1)
+def _get_pytesseract():
+    import pytesseract
+    return pytesseract
+
+@lru_cache(maxsize=1)
+def _get_torch():
+    import torch
+    return torch
+
+@lru_cache(maxsize=1)
+def _get_trocr():
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+    return TrOCRProcessor, VisionEncoderDecoderModel
+
+@lru_cache(maxsize=1)
+def _get_ort_vision2seq():
+    from optimum.onnxruntime import ORTModelForVision2Seq
+    return ORTModelForVision2Seq
+
 # --- OCR STRATEGY PATTERN ---
 
+# OCR engines accept a file path, encoded image bytes, or an already-decoded
+# PIL image / numpy array, so callers holding the image in memory skip a disk read
+ImageInput = Union[str, bytes, Any]
+
+def _open_image(image_module, image_or_path: ImageInput):
+    """Return a PIL image for any ImageInput; decoded images pass straight through."""
+    if isinstance(image_or_path, image_module.Image):
+        return image_or_path
+    if isinstance(image_or_path, (bytes, bytearray)):
+        return image_module.open(io.BytesIO(image_or_path))
+    if hasattr(image_or_path, "__array_interface__"):
+        return image_module.fromarray(image_or_path)
+    return image_module.open(image_or_path)
+
 class OCREngine(ABC):
     """Abstract base class to allow swapping OCR engines (Print vs Handwriting)."""
     @abstractmethod
-    def extract_text(self, image_path: str) -> str:
+    def extract_text(self, image_or_path: ImageInput) -> str:
         pass
 
+    def extract_text_batch(self, images_or_paths: List[ImageInput]) -> List[str]:
+        """OCR several images. Engines that can batch inference override this."""
+        return [self.extract_text(image_or_path) for image_or_path in images_or_paths]
+
+    def close(self):
+        """Release native resources held by the engine. No-op by default."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
 class TesseractEngine(OCREngine):
     """
     Standard OCR for PRINTED text.
     Pros: Fast, lightweight, runs on CPU.
     Cons: Fails significantly on cursive/handwriting.
     """
-    def __init__(self, cmd_path: Optional[str] = None):
+    # Images at least this tall are split into horizontal bands when tiling is on
+    TILE_MIN_HEIGHT = 1000
+    TILE_HEIGHT = 600
+
+    def __init__(self, cmd_path: Optional[str] = None, enable_tiling: bool = False, lang: str = "eng"):
+        """
+        Args:
+            enable_tiling: OCR large images as horizontal bands in parallel threads
+                           (Tesseract releases the GIL), one band per core.
+            lang: Tesseract language data. With tesserocr it is loaded once for the
+                  engine's lifetime; call close() or use `with TesseractEngine() as ocr:`.
+        """
         self.enabled = False
+        self.enable_tiling = enable_tiling
+        self.lang = lang
+        self.backend = None
+        self._api = None
+        self._api_lock = threading.Lock()
+        try:
+            self.Image = _get_pil_image()
+        except ImportError:
+            logger.error("PIL not installed. OCR disabled.")
+            return
+
+        # Prefer the in-process tesserocr binding; pytesseract spawns a
+        # tesseract subprocess and round-trips the image through a file per call.
         try:
-            import pytesseract
-            from PIL import Image
-            if cmd_path:
+            tesserocr = _get_tesserocr()
+            self.tesserocr = tesserocr
+            # One API instance reused across calls, so the engine/language
+            # data are only loaded once
+            self._api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.SINGLE_BLOCK)
+            self.backend = "tesserocr"
+            self.enabled = True
+            return
+        except ImportError:
+            pass
+        except RuntimeError as e:
+            logger.warning(f"tesserocr failed to initialize ({e}); falling back to pytesseract.")
+
+        try:
+            pytesseract = _get_pytesseract()
+            if cmd_path and pytesseract.pytesseract.tesseract_cmd != cmd_path:
                 pytesseract.pytesseract.tesseract_cmd = cmd_path
             self.pytesseract = pytesseract
-            self.Image = Image
+            self.backend = "pytesseract"
             self.enabled = True
         except ImportError:
             logger.error("Tesseract/PIL not installed. OCR disabled.")
 
-    def extract_text(self, image_path: str) -> str:
+    def close(self):
+        """Release the tesserocr API (no-op for pytesseract)."""
+        with self._api_lock:
+            if self._api is not None:
+                self._api.End()
+                self._api = None
+                self.enabled = False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def extract_text(self, image_or_path: ImageInput) -> str:
         if not self.enabled:
             return ""
         try:
-            img = self.Image.open(image_path)
-            # psm 6 assumes a single uniform block of text
-            return self.pytesseract.image_to_string(img, config='--psm 6')
+            img = _open_image(self.Image, image_or_path)
+            if self.enable_tiling and img.height >= self.TILE_MIN_HEIGHT:
+                return self._extract_tiled(img)
+            return self._image_to_string(img)
         except Exception as e:
             logger.error(f"Tesseract Extraction Failed: {e}")
             return ""
 
+    def _image_to_string(self, img) -> str:
+        if self.backend == "tesserocr":
+            # PyTessBaseAPI is not thread-safe; requests arrive from a threadpool
+            with self._api_lock:
+                self._api.SetImage(img)
+                return self._api.GetUTF8Text()
+        # psm 6 assumes a single uniform block of text
+        return self.pytesseract.image_to_string(img, lang=self.lang, config='--psm 6')
+
+    def _tile_to_string(self, img) -> str:
+        if self.backend == "tesserocr":
+            # Tiles run concurrently, so each gets its own short-lived API
+            # instead of serializing on the shared one
+            return self.tesserocr.image_to_text(img, lang=self.lang, psm=self.tesserocr.PSM.SINGLE_BLOCK)
+        return self._image_to_string(img)
+
+    def _extract_tiled(self, img) -> str:
+        """
+        Full-width bands rather than a 2-D grid, so a line of text is never
+        split left/right across tiles; results are joined top to bottom.
+        """
+        width, height = img.size
+        n_tiles = max(1, min(os.cpu_count() or 1, round(height / self.TILE_HEIGHT)))
+        bounds = [round(i * height / n_tiles) for i in range(n_tiles + 1)]
+        tiles = [img.crop((0, top, width, bottom)) for top, bottom in zip(bounds, bounds[1:])]
+        with ThreadPoolExecutor(max_workers=len(tiles)) as ex:
+            texts = list(ex.map(self._tile_to_string, tiles))
+        return "\n".join(texts)
+
 class HandwritingEngine(OCREngine):
     """
     Advanced OCR for HANDWRITTEN text (Cursive/Print).
     Uses Microsoft's TrOCR (Transformer-based Optical Character Recognition).
     """
-    def __init__(self):
+    # generation_config settings _generate_early_exit doesn't implement, at
+    # the values where generate() is plain greedy decoding (None = unset)
+    GREEDY_GENERATION_DEFAULTS = {
+        "num_beams": 1,
+        "num_return_sequences": 1,
+        "do_sample": False,
+        "no_repeat_ngram_size": 0,
+        "encoder_no_repeat_ngram_size": 0,
+        "repetition_penalty": 1.0,
+        "encoder_repetition_penalty": 1.0,
+        "min_length": 0,
+        "min_new_tokens": None,
+        "max_new_tokens": None,
+        "forced_bos_token_id": None,
+        "forced_eos_token_id": None,
+        "bad_words_ids": None,
+        "suppress_tokens": None,
+        "begin_suppress_tokens": None,
+        "sequence_bias": None,
+        "exponential_decay_length_penalty": None,
+    }
+
+    def __init__(self, early_exit: bool = True):
+        """
+        Args:
+            early_exit: Decode batches with _generate_early_exit, which drops
+                        pages from the batch once they emit EOS. Only used
+                        when the model's generation_config is plain greedy
+                        decoding; otherwise generate() runs.
+        """
         self.processor = None
         self.model = None
         self.enabled = False
+        self.early_exit = early_exit
         
         # In a real deployment, you would uncomment the imports below.
         
         try:
-            from transformers import TrOCRProcessor, VisionEncoderDecoderModel
-            from PIL import Image
-            import torch
+            TrOCRProcessor, VisionEncoderDecoderModel = _get_trocr()
+            Image = _get_pil_image()
+            torch = _get_torch()
             
             logger.info("Loading TrOCR Model (microsoft/trocr-base-handwritten)...")
             self.processor = TrOCRProcessor.from_pretrained('microsoft/trocr-base-handwritten')
             self.model = VisionEncoderDecoderModel.from_pretrained('microsoft/trocr-base-handwritten')
+            # Run on the GPU in fp16 when available; CPU stays fp32 (half is slow/unsupported there)
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.dtype = torch.float16 if self.device.type == "cuda" else torch.float32
+            self.model = self.model.to(self.device, dtype=self.dtype).eval()
             self.Image = Image
             self.torch = torch
             self.enabled = True
@@ -73,42 +329,260 @@ class HandwritingEngine(OCREngine):
         if not self.enabled:
             logger.warning("Handwriting Engine is currently a placeholder. Install 'transformers' to enable.")
 
-    def extract_text(self, image_path: str) -> str:
+    def extract_text(self, image_or_path: ImageInput) -> str:
+        return self.extract_text_batch([image_or_path])[0]
+
+    def extract_text_batch(self, images_or_paths: List[ImageInput]) -> List[str]:
+        """
+        OCR several images with a single generate() call.
+        Stacking the pages into one (B, C, H, W) batch amortizes the encoder
+        pass and per-step decoder launches across all of them.
+        """
+        if not self.enabled:
+            return ["[HANDWRITING OCR NOT LOADED]"] * len(images_or_paths)
+        
+        texts = [""] * len(images_or_paths)
+        images = []
+        loaded = []  # indices of images that opened successfully
+        for idx, image_or_path in enumerate(images_or_paths):
+            try:
+                images.append(_open_image(self.Image, image_or_path).convert("RGB"))
+                loaded.append(idx)
+            except Exception as e:
+                logger.error(f"TrOCR Failed to load image {idx}: {e}")
+        
+        if not images:
+            return texts
+        
+        try:
+            pixel_values = self.processor(images=images, return_tensors="pt").pixel_values
+            pixel_values = pixel_values.to(self.device, dtype=self.dtype)
+            token_ids = None
+            if self.early_exit and len(images) > 1 and self._early_exit_supported():
+                token_ids = self._special_token_ids()
+                if token_ids is None:
+                    logger.warning("TrOCR decoder start/EOS token ids not configured; "
+                                   "decoding without early exit.")
+            with self.torch.inference_mode():
+                if token_ids is not None:
+                    generated_ids = self._generate_early_exit(pixel_values, *token_ids)
+                else:
+                    generated_ids = self.model.generate(pixel_values)
+            generated_texts = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            for idx, generated_text in zip(loaded, generated_texts):
+                texts[idx] = generated_text
+        except Exception:
+            logger.exception("TrOCR batch decoding failed")
+        return texts
+
+    def _early_exit_supported(self) -> bool:
+        """
+        True if generate() would do plain greedy decoding with this model's
+        generation_config, up to an explicit max_length (an unset one means
+        generate()'s own default, which depends on the transformers version).
+        """
+        config = self.model.generation_config
+        return config.max_length is not None and all(
+            getattr(config, name, default) in (None, default)
+            for name, default in self.GREEDY_GENERATION_DEFAULTS.items()
+        )
+
+    def _special_token_ids(self) -> Optional[Tuple[int, List[int], int]]:
+        """
+        (decoder_start, EOS ids, pad) for _generate_early_exit, looked up
+        like generate() does: generation_config first, then the decoder's
+        config (a VisionEncoderDecoder's top-level config often leaves
+        them None). Returns None if the start or EOS token is unknown.
+        """
+        sources = (self.model.generation_config, self.model.decoder.config)
+
+        def lookup(name):
+            for source in sources:
+                value = getattr(source, name, None)
+                if value is not None:
+                    return value
+            return None
+
+        start_id = lookup("decoder_start_token_id")
+        if start_id is None:
+            start_id = lookup("bos_token_id")
+        eos_ids = lookup("eos_token_id")
+        if start_id is None or eos_ids is None:
+            return None
+        if isinstance(eos_ids, int):
+            eos_ids = [eos_ids]
+        pad_id = lookup("pad_token_id")
+        if pad_id is None:
+            # generate() pads with EOS when no pad token is set
+            pad_id = eos_ids[0]
+        return start_id, list(eos_ids), pad_id
+
+    def _generate_early_exit(self, pixel_values, start_id: int, eos_ids: List[int], pad_id: int):
+        """
+        Greedy decoding equivalent to model.generate() (num_beams=1), except
+        that rows which have produced EOS are sliced out of the decoder
+        inputs, encoder states and KV cache. generate() keeps computing
+        logits for finished rows until the longest page is done, so on
+        batches of uneven line lengths most of the decoder work is wasted.
+        """
+        torch = self.torch
+        model = self.model
+        max_length = model.generation_config.max_length
+        batch_size = pixel_values.shape[0]
+        device = pixel_values.device
+
+        encoder_hidden = model.encoder(pixel_values=pixel_values).last_hidden_state
+        sequences = torch.full((batch_size, max_length), pad_id, dtype=torch.long, device=device)
+        sequences[:, 0] = start_id
+        eos_ids = torch.tensor(eos_ids, device=device)
+        active = torch.arange(batch_size, device=device)  # original row of each live sequence
+        next_input = sequences[:, :1]
+        past = None
+
+        step = 0
+        for step in range(1, max_length):
+            outputs = model(
+                encoder_outputs=(encoder_hidden,),
+                decoder_input_ids=next_input,
+                past_key_values=past,
+                use_cache=True,
+            )
+            next_tokens = outputs.logits[:, -1, :].argmax(dim=-1)
+            sequences[active, step] = next_tokens
+            past = outputs.past_key_values
+
+            unfinished = ~torch.isin(next_tokens, eos_ids)
+            if not unfinished.all():
+                if not unfinished.any():
+                    break
+                keep = unfinished.nonzero(as_tuple=True)[0]
+                active = active[keep]
+                encoder_hidden = encoder_hidden[keep]
+                next_tokens = next_tokens[keep]
+                past = self._select_cache_rows(past, keep)
+            next_input = next_tokens[:, None]
+
+        return sequences[:, :step + 1]
+
+    @staticmethod
+    def _select_cache_rows(past, rows):
+        """Keep only `rows` of the batch dimension in a decoder KV cache."""
+        if hasattr(past, "reorder_cache"):
+            # transformers Cache objects (DynamicCache / EncoderDecoderCache), in place
+            past.reorder_cache(rows)
+            return past
+        # Legacy tuple-of-tuples cache
+        return tuple(tuple(t.index_select(0, rows) for t in layer) for layer in past)
+
+class OnnxHandwritingEngine(OCREngine):
+    """
+    TrOCR on ONNX Runtime, for CPU/edge hosts without a GPU.
+    ORT applies graph fusion and constant folding that eager PyTorch lacks.
+    Export the model once with:
+        optimum-cli export onnx --model microsoft/trocr-base-handwritten ./trocr-onnx
+    """
+    def __init__(self, model_dir: str = "trocr-onnx", provider: str = "CPUExecutionProvider"):
+        self.processor = None
+        self.model = None
+        self.enabled = False
+        
+        try:
+            ORTModelForVision2Seq = _get_ort_vision2seq()
+            TrOCRProcessor, _ = _get_trocr()
+            Image = _get_pil_image()
+            
+            logger.info(f"Loading ONNX TrOCR Model ({model_dir})...")
+            self.processor = TrOCRProcessor.from_pretrained(model_dir)
+            self.model = ORTModelForVision2Seq.from_pretrained(model_dir, provider=provider)
+            self.Image = Image
+            self.enabled = True
+        except ImportError:
+            logger.warning("optimum[onnxruntime] not found. ONNX Handwriting OCR disabled.")
+        except Exception as e:
+            logger.error(f"Failed to load ONNX TrOCR model from {model_dir}: {e}")
+
+    def extract_text(self, image_or_path: ImageInput) -> str:
+        return self.extract_text_batch([image_or_path])[0]
+
+    def extract_text_batch(self, images_or_paths: List[ImageInput]) -> List[str]:
         if not self.enabled:
-            return "[HANDWRITING OCR NOT LOADED]"
+            return ["[HANDWRITING OCR NOT LOADED]"] * len(images_or_paths)
+        
+        texts = [""] * len(images_or_paths)
+        images = []
+        loaded = []  # indices of images that opened successfully
+        for idx, image_or_path in enumerate(images_or_paths):
+            try:
+                images.append(_open_image(self.Image, image_or_path).convert("RGB"))
+                loaded.append(idx)
+            except Exception as e:
+                logger.error(f"ONNX TrOCR Failed to load image {idx}: {e}")
+        
+        if not images:
+            return texts
         
         try:
-            image = self.Image.open(image_path).convert("RGB")
-            pixel_values = self.processor(images=image, return_tensors="pt").pixel_values
+            pixel_values = self.processor(images=images, return_tensors="pt").pixel_values
             generated_ids = self.model.generate(pixel_values)
-            generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-            return generated_text
+            generated_texts = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            for idx, generated_text in zip(loaded, generated_texts):
+                texts[idx] = generated_text
         except Exception as e:
-            logger.error(f"TrOCR Failed: {e}")
-            return ""
+            logger.error(f"ONNX TrOCR Failed: {e}")
+        return texts
 
 # --- MAIN PROCESSOR ---
 
 class ReportProcessor:
-    def __init__(self, use_handwriting_model: bool = False, tesseract_cmd: Optional[str] = None):
+    # Max entries in the memoized time/severity cache
+    FIELDS_CACHE_SIZE = 4096
+
+    def __init__(self, use_handwriting_model: Union[bool, str] = False, tesseract_cmd: Optional[str] = None,
+                 onnx_model_dir: str = "trocr-onnx"):
         """
         Args:
-            use_handwriting_model: If True, attempts to load TrOCR. If False, uses Tesseract.
+            use_handwriting_model: If True, attempts to load TrOCR. If "onnx", loads the
+                                   ONNX Runtime export from onnx_model_dir. If False, uses Tesseract.
         """
         self.severity_keywords = {
             "severe": ["severe", "fatal", "critical", "major", "crushed", "destroyed"],
             "moderate": ["moderate", "medium", "dent", "bumper"],
             "minor": ["minor", "scratch", "fender bender", "light", "scuff"]
         }
+        # All keywords in one word-boundary alternation so the text is scanned
+        # once; each keyword maps to its level's priority (0 = checked first)
+        self._severity_rank = {
+            keyword: (rank, sev_level)
+            for rank, (sev_level, keywords) in enumerate(self.severity_keywords.items())
+            for keyword in keywords
+        }
+        self._severity_re = _regex.compile(
+            r'\b(' + '|'.join(
+                re.escape(keyword) for keyword in sorted(self._severity_rank, key=len, reverse=True)
+            ) + r')\b'
+        )
+        self._severity_keywords_flat = tuple(self._severity_rank)
         self.type_keywords = ["head-on", "rear-end", "sideswipe", "collision", "T-bone"]
 
-        if use_handwriting_model:
+        # (TReport, SeverityReport) memoized by a digest of the cleaned text,
+        # so retried/duplicate reports skip the regex passes
+        self._fields_cache: "OrderedDict[bytes, Tuple[int, str]]" = OrderedDict()
+        self._fields_cache_lock = threading.Lock()
+
+        if use_handwriting_model == "onnx":
+            logger.info("Initializing ONNX Handwriting Engine...")
+            self.ocr_engine = OnnxHandwritingEngine(model_dir=onnx_model_dir)
+        elif use_handwriting_model:
             logger.info("Initializing Advanced Handwriting Engine...")
             self.ocr_engine = HandwritingEngine()
         else:
             logger.info("Initializing Standard Tesseract Engine...")
             self.ocr_engine = TesseractEngine(cmd_path=tesseract_cmd)
 
+    def close(self):
+        """Release the OCR engine's native resources (e.g. the tesserocr API)."""
+        self.ocr_engine.close()
+
     def _parse_time_to_seconds(self, time_str: str) -> int:
         """
         Parses time strings (12h/24h) into total seconds.
@@ -116,18 +590,6 @@ class ReportProcessor:
         """
         time_str = time_str.upper().strip()
         
-        # --- Expanded OCR Error Correction for Time ---
-        # OCR often confuses letters with numbers. 
-        # We apply these replacements to sanitize the input.
-        ocr_digit_map = {
-            "O": "0", "o": "0", "Q": "0", "D": "0",  # Zero-likes
-            "I": "1", "l": "1", "L": "1", "|": "1",  # One-likes
-            "Z": "2",                                # Two-likes
-            "S": "5", "s": "5",                      # Five-likes
-            "B": "8",                                # Eight-likes
-            "G": "6"                                 # Six-likes
-        }
-        
         # Logic: Isolate AM/PM, clean digits, recombine.
         meridian = ""
         if "PM" in time_str: meridian = "PM"
@@ -136,120 +598,136 @@ class ReportProcessor:
         # Remove meridian to focus on cleaning digits
         clean_part = time_str.replace("PM", "").replace("AM", "").strip()
         
-        # Apply digit map to the numbers part
-        for char, digit in ocr_digit_map.items():
-            clean_part = clean_part.replace(char, digit)
-            
-        # Reconstruct normalized string
-        time_str = f"{clean_part} {meridian}".strip()
+        # Apply digit map to the numbers part (single translate pass)
+        clean_part = clean_part.translate(_OCR_DIGIT_TABLE)
         
-        is_pm = "PM" in time_str
-        is_am = "AM" in time_str
+        is_pm = meridian == "PM"
+        is_am = meridian == "AM"
         
-        clean_time = re.sub(r"[^0-9:]", "", time_str)
-        parts = clean_time.split(":")
+        # Single pass: accumulate digits per ':'-separated field, skip any other
+        # leftover characters. A field with no digits is None (unparseable).
+        parts = []
+        value, has_digit = 0, False
+        for ch in clean_part:
+            if ch == ":":
+                parts.append(value if has_digit else None)
+                value, has_digit = 0, False
+            elif "0" <= ch <= "9":
+                value = value * 10 + ord(ch) - 48
+                has_digit = True
+        parts.append(value if has_digit else None)
         
-        try:
-            if len(parts) < 2: return -1
-            hours = int(parts[0])
-            minutes = int(parts[1])
-            seconds = int(parts[2]) if len(parts) > 2 else 0
+        if len(parts) < 2: return -1
+        parts = parts[:3]
+        if None in parts: return -1
+        hours, minutes = parts[0], parts[1]
+        seconds = parts[2] if len(parts) > 2 else 0
+        
+        if (is_pm and hours < 12): hours += 12
+        if (is_am and hours == 12): hours = 0
             
-            if (is_pm and hours < 12): hours += 12
-            if (is_am and hours == 12): hours = 0
-                
-            return (hours * 3600) + (minutes * 60) + seconds
-        except ValueError:
-            return -1
+        return (hours * 3600) + (minutes * 60) + seconds
 
     def extract_time(self, text: str) -> int:
-        # 1. Look for labeled time fields (Contextual Search)
-        # Regex matches digits OR common OCR letter-errors (O, I, l, S, etc.)
-        # This allows us to catch "Time: l0:30" and pass it to the cleaner logic.
-        form_regex = r"(?:Time|at)[:\s\.]*([0-9OQlIzsS]{1,2}\s*[:\.]\s*[0-9OQlIzsS]{2})(?:\s*[:\.]\s*[0-9OQlIzsS]{2})?\s*(AM|PM)?"
-        match = re.search(form_regex, text, re.IGNORECASE)
-        
-        if match:
-            time_str = match.group(1).replace(".", ":") # Fix dot vs colon
-            if match.group(2):
-                time_str += f" {match.group(2)}"
-            logger.info(f"Time found (Contextual): {time_str}")
-            return self._parse_time_to_seconds(time_str)
-
-        # 2. Look for standalone time patterns (General Search)
-        # Slightly stricter to avoid false positives, but allows basic O/I errors
-        general_regex = r"\b([0-9OQlI]{1,2}:[0-9OQlI]{2}(?::[0-9OQlI]{2})?)\b"
-        match = re.search(general_regex, text)
-        if match:
-            logger.info(f"Time found (General): {match.group(1)}")
-            return self._parse_time_to_seconds(match.group(1))
+        # Labeled times take priority over standalone ones anywhere in the text,
+        # so keep scanning past general matches until a contextual one appears
+        general = None
+        for match in _TIME_RE.finditer(text):
+            if match.group("ctx"):
+                # 1. Labeled time field (Contextual Search)
+                time_str = match.group("ctx").replace(".", ":") # Fix dot vs colon
+                if match.group("ampm"):
+                    time_str += f" {match.group('ampm')}"
+                logger.info(f"Time found (Contextual): {time_str}")
+                return self._parse_time_to_seconds(time_str)
+            if general is None:
+                general = match.group("gen")
+
+        # 2. Fall back to the first standalone time pattern (General Search)
+        if general:
+            logger.info(f"Time found (General): {general}")
+            return self._parse_time_to_seconds(general)
 
         return -1
 
     def extract_severity(self, text: str) -> str:
         text_lower = text.lower()
         
-        # --- Comprehensive OCR/Spelling Correction Map ---
-        # Maps regex pattern -> corrected word
-        # Covers substitutions, truncations, and visual mimicry
-        ocr_fixes = {
-            # Severe: v->u, v->y, e->c, truncations
-            r'\bsever\b': 'severe',
-            r'\bsevre\b': 'severe',
-            r'\bsvere\b': 'severe',
-            r'\bseyere\b': 'severe',
-            r'\b5evere\b': 'severe',
-            r'\bseverc\b': 'severe',
-            r'\bsevcre\b': 'severe',
-            
-            # Fatal: l->1, l->I, t->f, l->i
-            r'\bfata1\b': 'fatal',
-            r'\bfataI\b': 'fatal',
-            r'\bfatai\b': 'fatal',
-            r'\bfatsl\b': 'fatal',
-            
-            # Minor: o->c, o->a, m->rn, n->m, i->l
-            r'\bmincr\b': 'minor',
-            r'\bminar\b': 'minor',
-            r'\brninor\b': 'minor', # 'rn' looks like 'm'
-            r'\bmlnor\b': 'minor',
-            r'\bninor\b': 'minor',  # 'n' looks like 'm'
-            r'\bmimor\b': 'minor',
-            
-            # Moderate: d->b, ate->8, n->m
-            r'\bmoderate\b': 'moderate',
-            r'\bmoberate\b': 'moderate', # 'b' looks like 'd'
-            r'\bnoderate\b': 'moderate',
-            r'\bmodr8\b': 'moderate',
-            r'\bmodrate\b': 'moderate'
-        }
-
-        # Apply corrections via Regex Substitution
-        for pattern, correction in ocr_fixes.items():
-            text_lower = re.sub(pattern, correction, text_lower)
+        # Apply corrections via a single Regex Substitution pass
+        text_lower = _OCR_FIX_RE.sub(lambda m: _OCR_FIX_MAP[m.group(1)], text_lower)
         
-        # Standard keyword matching
-        for sev_level, keywords in self.severity_keywords.items():
-            for keyword in keywords:
-                if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
-                    logger.info(f"Severity found: {sev_level.title()} (match: {keyword})")
-                    return sev_level.title()
+        # Fast path: C substring scans reject keyword-free text much faster
+        # than a failed regex alternation; the regex still enforces word boundaries
+        if not any(keyword in text_lower for keyword in self._severity_keywords_flat):
+            return "Unknown"
+        
+        # Standard keyword matching: highest-priority level found anywhere wins
+        best = None
+        for match in self._severity_re.finditer(text_lower):
+            keyword = match.group(1)
+            rank, sev_level = self._severity_rank[keyword]
+            if best is None or rank < best[0]:
+                best = (rank, sev_level, keyword)
+                if rank == 0:
+                    break
+        
+        if best:
+            _, sev_level, keyword = best
+            logger.info(f"Severity found: {sev_level.title()} (match: {keyword})")
+            return sev_level.title()
         return "Unknown"
 
-    def process_report(self, input_data: str, is_image_path: bool = False) -> Dict[str, Any]:
-        if is_image_path:
+    def process_report(self, input_data: ImageInput, is_image_path: bool = False) -> Dict[str, Any]:
+        """
+        Args:
+            input_data: Report text, or (with is_image_path=True) a report image as a
+                        path, bytes, or decoded PIL image/array. Non-str input is always OCR'd.
+        """
+        if is_image_path or not isinstance(input_data, str):
             raw_text = self.ocr_engine.extract_text(input_data)
         else:
             raw_text = input_data
 
+        return self._process_text(raw_text)
+
+    def process_report_batch(self, images_or_paths: List[ImageInput]) -> List[Dict[str, Any]]:
+        """
+        OCR several report images in one batch (a single model call for
+        TrOCR), then parse each. Results are in the same order as the input.
+        """
+        raw_texts = self.ocr_engine.extract_text_batch(images_or_paths)
+        return [self._process_text(raw_text) for raw_text in raw_texts]
+
+    def _process_text(self, raw_text: str) -> Dict[str, Any]:
         if not raw_text:
             return {"error": "No text to process"}
 
         clean_text = raw_text.replace("\n", " ")
+        t_report, severity = self._extract_fields(clean_text)
 
         return {
-            "TReport": self.extract_time(clean_text),
-            "SeverityReport": self.extract_severity(clean_text),
+            "TReport": t_report,
+            "SeverityReport": severity,
             "RawTextSnippet": clean_text[:100] + "..."
         }
+
+    def _extract_fields(self, clean_text: str) -> Tuple[int, str]:
+        """
+        LRU-memoized time/severity extraction. Keyed on a 16-byte blake2b
+        digest rather than the text itself so large OCR pages aren't retained.
+        """
+        key = hashlib.blake2b(clean_text.encode(), digest_size=16).digest()
+        with self._fields_cache_lock:
+            fields = self._fields_cache.get(key)
+            if fields is not None:
+                self._fields_cache.move_to_end(key)
+                return fields
+
+        fields = (self.extract_time(clean_text), self.extract_severity(clean_text))
+
+        with self._fields_cache_lock:
+            self._fields_cache[key] = fields
+            if len(self._fields_cache) > self.FIELDS_CACHE_SIZE:
+                self._fields_cache.popitem(last=False)
+        return fields
     
\ No newline at end of file
@@ -5,13 +5,99 @@ Analyzes video files using YOLOv8 to detect people, cars, and weapons.
 Returns statistics about detected objects and annotated frames.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import numpy as np
 import cv2
 from ultralytics import YOLO
 import os
 
 
+# YOLO COCO class IDs:
+# person = 0
+# car = 2, motorcycle = 3, bus = 5, truck = 7
+# knife = 76 (if present in model)
+# gun/firearm detection may need custom model, but we'll try knife as proxy
+PERSON_CLASS_IDS = [0]
+VEHICLE_CLASS_IDS = [2, 3, 5, 7]  # car, motorcycle, bus, truck
+
+# Note: Standard YOLOv8 doesn't detect guns reliably. We'll check for knife (76)
+# and look for suspicious objects. For MVP, this is a limitation.
+WEAPON_CLASS_IDS = [76]  # knife - main weapon class in COCO
+
+# Only count high-confidence detections
+MIN_DETECTION_CONFIDENCE = 0.5
+
+
+def count_objects(result: Any) -> Tuple[int, int, bool]:
+    """
+    Count people, cars, and weapons in a single YOLO result.
+    
+    Args:
+        result: Ultralytics Results object for one frame
+    
+    Returns:
+        Tuple of (people_count, cars_count, has_weapon)
+    """
+    people_count = 0
+    cars_count = 0
+    has_weapon = False
+    
+    if result.boxes is not None:
+        for box in result.boxes:
+            cls_id = int(box.cls[0])
+            conf = float(box.conf[0])
+            
+            if conf < MIN_DETECTION_CONFIDENCE:
+                continue
+            
+            if cls_id in PERSON_CLASS_IDS:
+                people_count += 1
+            elif cls_id in VEHICLE_CLASS_IDS:
+                cars_count += 1
+            elif cls_id in WEAPON_CLASS_IDS:
+                has_weapon = True
+    
+    return people_count, cars_count, has_weapon
+
+
+def analyze_frames(results: List[Any]) -> Dict[str, Any]:
+    """
+    Summarize YOLO results that were already computed on sampled frames.
+    
+    Lets callers that have run detection themselves (e.g. VideoKeyframeProcessor)
+    get people/cars/weapons statistics without decoding the video again.
+    
+    Args:
+        results: Ultralytics Results objects, one per sampled frame, in order
+    
+    Returns:
+        Same dictionary layout as analyze_video()
+    """
+    max_people = 0
+    max_cars = 0
+    weapon_present = False
+    
+    for result in results:
+        people_count, cars_count, has_weapon = count_objects(result)
+        max_people = max(max_people, people_count)
+        max_cars = max(max_cars, cars_count)
+        if has_weapon:
+            weapon_present = True
+    
+    # Select up to 3 frames evenly spaced (first, middle, last) and only
+    # draw annotations on those
+    if len(results) > 3:
+        results = [results[0], results[len(results) // 2], results[-1]]
+    annotated_frames = [result.plot() for result in results]
+    
+    return {
+        "people": max_people,
+        "cars": max_cars,
+        "weapon_present": weapon_present,
+        "frames": annotated_frames
+    }
+
+
 def analyze_video(video_path: str, frame_rate: int = 1) -> Dict[str, Any]:
     """
     Analyze a video file to detect people, cars, and weapons.
@@ -48,30 +134,8 @@ def analyze_video(video_path: str, frame_rate: int = 1) -> Dict[str, Any]:
     # Calculate frame interval based on desired frame_rate
     frame_interval = max(1, int(fps / frame_rate))
     
-    # Track maximum counts across all frames
-    max_people = 0
-    max_cars = 0
-    weapon_present = False
-    
-    # Store annotated frames for visualization (limit to 3 frames)
-    annotated_frames = []
-    
     frame_count = 0
-    processed_count = 0
-    frames_to_save = []
-    
-    # YOLO COCO class IDs:
-    # person = 0
-    # car = 2, motorcycle = 3, bus = 5, truck = 7
-    # knife = 76 (if present in model)
-    # gun/firearm detection may need custom model, but we'll try knife as proxy
-    
-    person_class_ids = [0]
-    vehicle_class_ids = [2, 3, 5, 7]  # car, motorcycle, bus, truck
-    
-    # Note: Standard YOLOv8 doesn't detect guns reliably. We'll check for knife (76) 
-    # and look for suspicious objects. For MVP, this is a limitation.
-    weapon_class_ids = [76]  # knife - main weapon class in COCO
+    sampled_results = []
     
     while True:
         ret, frame = cap.read()
@@ -80,76 +144,29 @@ def analyze_video(video_path: str, frame_rate: int = 1) -> Dict[str, Any]:
         
         # Process frame at specified interval
         if frame_count % frame_interval == 0:
-            # Run YOLO detection
+            # Run YOLO detection; keep the result for the single frame
             results = model(frame, verbose=False)
-            
-            # Get detections from first result (single frame)
-            detections = results[0]
-            
-            # Count objects
-            people_count = 0
-            cars_count = 0
-            has_weapon = False
-            
-            # Process detections
-            if detections.boxes is not None:
-                for box in detections.boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    
-                    # Only count high-confidence detections (>0.5)
-                    if conf < 0.5:
-                        continue
-                    
-                    if cls_id in person_class_ids:
-                        people_count += 1
-                    elif cls_id in vehicle_class_ids:
-                        cars_count += 1
-                    elif cls_id in weapon_class_ids:
-                        has_weapon = True
-            
-            # Update maximum counts
-            max_people = max(max_people, people_count)
-            max_cars = max(max_cars, cars_count)
-            if has_weapon:
-                weapon_present = True
-            
-            # Store annotated frame for later selection
-            annotated_frame = detections.plot()
-            frames_to_save.append(annotated_frame)
-            
-            processed_count += 1
+            sampled_results.append(results[0])
         
         frame_count += 1
     
     cap.release()
     
-    # Select up to 3 frames evenly spaced from processed frames
-    if len(frames_to_save) > 0:
-        if len(frames_to_save) <= 3:
-            annotated_frames = frames_to_save
-        else:
-            # Select evenly spaced frames (first, middle, last)
-            step = len(frames_to_save) // 3
-            annotated_frames = [
-                frames_to_save[0],
-                frames_to_save[len(frames_to_save) // 2],
-                frames_to_save[-1]
-            ]
-    else:
+    if not sampled_results:
         # Fallback: re-analyze first frame if no frames were processed
         cap = cv2.VideoCapture(video_path)
         ret, frame = cap.read()
         if ret:
             results = model(frame, verbose=False)
-            annotated_frame = results[0].plot()
-            annotated_frames.append(annotated_frame)
+            sampled_results.append(results[0])
         cap.release()
-    
-    return {
-        "people": max_people,
-        "cars": max_cars,
-        "weapon_present": weapon_present,
-        "frames": annotated_frames
-    }
-
+        
+        # Preserve the original fallback: annotated frame only, no counts
+        return {
+            "people": 0,
+            "cars": 0,
+            "weapon_present": False,
+            "frames": [result.plot() for result in sampled_results]
+        }
+    
+    return analyze_frames(sampled_results)
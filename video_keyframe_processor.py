@@ -6,13 +6,83 @@ Extracts keyframes from video, detects collisions, and classifies severity
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import Tuple, List, Dict, Optional
+from typing import Tuple, List, Dict, Optional, Iterator, Callable
 import json
+import queue
+import threading
 from ultralytics import YOLO
-from torchvision import models, transforms
+from torchvision import models
 import torch
 import torch.nn as nn
-from PIL import Image
+import torch.nn.functional as F
+
+try:
+    import ffmpegcv  # NVDEC hardware decode (optional)
+except ImportError:
+    ffmpegcv = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()  # SIMD libjpeg-turbo encoder
+except (ImportError, OSError, RuntimeError):
+    # Package missing or libturbojpeg shared library not found
+    _turbo_jpeg = None
+
+# Quality for saved keyframe JPEGs
+KEYFRAME_JPEG_QUALITY = 85
+
+
+# COCO class IDs for vehicles (car, motorcycle, bus, truck)
+VEHICLE_CLASS_IDS = np.array([2, 3, 5, 7])
+
+# Marks the end of the decoded keyframe stream in the reader queue
+_END_OF_STREAM = object()
+
+
+# Quantized engines that _QuantizedSeverityMobileNetV2 can target
+_INT8_ENGINES = ('x86', 'fbgemm', 'onednn', 'qnnpack')
+
+
+class _QuantizedSeverityMobileNetV2(nn.Module):
+    """
+    ImageNet MobileNetV2 feature extractor, fused and statically quantized
+    to INT8 for the process's current quantized engine
+    (torch.backends.quantized.engine: x86/fbgemm on x86 CPUs, qnnpack on
+    ARM), with a float 3-class head. It is the CPU counterpart of
+    mobilenet_v2 with a replaced classifier[1]; the convolutions run as
+    INT8 kernels. The global engine setting is left untouched
+    (torchvision's quantize=True loader would switch it to qnnpack).
+    """
+    
+    # Observer calibration: batches of 4 synthetic normalized images
+    CALIBRATION_BATCHES = 8
+    
+    def __init__(self, num_classes: int = 3):
+        super().__init__()
+        backbone = models.quantization.mobilenet_v2(pretrained=True, quantize=False)
+        backbone.eval()
+        backbone.fuse_model()
+        backbone.qconfig = torch.ao.quantization.get_default_qconfig(torch.backends.quantized.engine)
+        torch.ao.quantization.prepare(backbone, inplace=True)
+        # No reference footage at load time, so activation ranges are
+        # observed on seeded noise with the unit scale of ImageNet-normalized input
+        generator = torch.Generator().manual_seed(0)
+        with torch.no_grad():
+            for _ in range(self.CALIBRATION_BATCHES):
+                backbone(torch.randn(4, 3, 224, 224, generator=generator))
+        torch.ao.quantization.convert(backbone, inplace=True)
+        self.quant = backbone.quant
+        self.features = backbone.features
+        self.dequant = backbone.dequant
+        self.classifier = nn.Sequential(
+            nn.Dropout(0.2),
+            nn.Linear(backbone.last_channel, num_classes)
+        )
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = self.dequant(self.features(self.quant(x)))
+        x = F.adaptive_avg_pool2d(x, (1, 1)).flatten(1)
+        return self.classifier(x)
 
 
 class VideoKeyframeProcessor:
@@ -25,7 +95,13 @@ class VideoKeyframeProcessor:
         collision_model_path: str = "yolov8n.pt",
         severity_model_path: Optional[str] = None,
         keyframe_interval: int = 5,
-        collision_threshold: float = 0.5
+        collision_threshold: float = 0.5,
+        prefetch: int = 8,
+        hw_decode: bool = True,
+        batch_size: int = 8,
+        tensorrt: bool = False,
+        quantize_severity: bool = True,
+        coarse_stride: int = 1
     ):
         """
         Initialize the Video Keyframe Processor.
@@ -35,33 +111,156 @@ class VideoKeyframeProcessor:
             severity_model_path: Path to custom severity classification model
             keyframe_interval: Extract keyframe every N frames
             collision_threshold: Confidence threshold for collision detection
+            prefetch: Max decoded keyframes buffered ahead of inference
+            hw_decode: Decode on the GPU (NVDEC via ffmpegcv) when a CUDA
+                device and ffmpegcv are available
+            batch_size: Keyframes per collision detector inference call
+            tensorrt: On a CUDA device, build FP16 TensorRT engines for both
+                models on first use and cache them next to the weights
+                (YOLO via ultralytics export, MobileNetV2 via torch_tensorrt)
+            quantize_severity: When the severity classifier runs on CPU, use
+                an INT8 MobileNetV2 backbone (dynamic INT8 Linear layers for
+                custom models)
+            coarse_stride: If > 1, process_video first probes only every
+                Nth keyframe, stops at the first collision, then analyzes the
+                keyframes within one probe step of it. Keyframes past that
+                window are never analyzed, so kept YOLO results (and counts
+                built from them) only cover the clip up to the collision.
+                1 = scan every keyframe
         """
         self.keyframe_interval = keyframe_interval
         self.collision_threshold = collision_threshold
+        self.prefetch = max(prefetch, batch_size)
+        self.batch_size = max(1, batch_size)
+        self.coarse_stride = max(1, coarse_stride)
+        self.use_nvdec = hw_decode and ffmpegcv is not None and torch.cuda.is_available()
+        if self.use_nvdec:
+            print("Using NVDEC hardware video decoding")
         
-        # Load YOLOv8 for collision detection
+        self.use_tensorrt = tensorrt and torch.cuda.is_available()
+        
+        # Load YOLOv8 for collision detection, preferring a TensorRT engine
+        # exported next to the weights (see export_collision_engine)
+        if (self.use_tensorrt and Path(collision_model_path).suffix == '.pt'
+                and not Path(collision_model_path).with_suffix('.engine').exists()):
+            print("Building FP16 TensorRT engine for the collision model (one-time)...")
+            try:
+                self.export_collision_engine(collision_model_path, int8=False, batch=self.batch_size)
+            except Exception as e:
+                # e.g. tensorrt not installed, driver/GPU mismatch, out of memory
+                print(f"TensorRT export of collision model failed ({e}); using PyTorch")
+        collision_model_path = self._resolve_collision_model(collision_model_path)
         print(f"Loading collision detection model: {collision_model_path}")
-        self.collision_detector = YOLO(collision_model_path)
+        self.collision_detector = YOLO(collision_model_path, task='detect')
         
-        # Load/Initialize severity classifier
-        self.severity_classifier = self._init_severity_classifier(severity_model_path)
-        self.severity_transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                               std=[0.229, 0.224, 0.225])
-        ])
+        # Severity classifier (fp32, or fp16 with a TensorRT engine) is
+        # loaded on first use: the rule-based path covers frames with detections
+        self.severity_device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.severity_dtype = torch.float32
+        self._severity_model_path = severity_model_path
+        self.quantize_severity = quantize_severity
+        self._severity_classifier = None
+        # ImageNet normalization, applied on-device in _severity_preprocess
+        self._severity_mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+        self._severity_std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
         
         self.severity_classes = ["Minor", "Moderate", "Severe"]
         
+    @property
+    def severity_classifier(self) -> nn.Module:
+        """Severity CNN, initialized the first time it is needed."""
+        if self._severity_classifier is None:
+            self._severity_classifier = self._init_severity_classifier(
+                self._severity_model_path
+            ).to(self.severity_device)
+            self._severity_mean = self._severity_mean.to(self.severity_device)
+            self._severity_std = self._severity_std.to(self.severity_device)
+            if self.use_tensorrt:
+                self._enable_severity_tensorrt(self._severity_model_path)
+            if not isinstance(self._severity_classifier, torch.jit.ScriptModule):
+                self._severity_classifier = self._freeze_severity_classifier(self._severity_classifier)
+        return self._severity_classifier
+    
+    @severity_classifier.setter
+    def severity_classifier(self, model: nn.Module):
+        self._severity_classifier = model
+    
+    @staticmethod
+    def _resolve_collision_model(model_path: str) -> str:
+        """
+        Return the sibling TensorRT `.engine` of a `.pt` model if one exists
+        and a CUDA device is available, otherwise the original path.
+        """
+        engine_path = Path(model_path).with_suffix('.engine')
+        if Path(model_path).suffix == '.pt' and engine_path.exists() and torch.cuda.is_available():
+            return str(engine_path)
+        return model_path
+    
+    @staticmethod
+    def export_collision_engine(
+        model_path: str = "yolov8n.pt",
+        calibration_data: Optional[str] = None,
+        imgsz: int = 640,
+        int8: bool = True,
+        batch: int = 8,
+        nms: bool = True
+    ) -> str:
+        """
+        Export a YOLOv8 model to a TensorRT engine (run once, offline, on the
+        GPU that will serve it). The engine is written next to the weights and
+        picked up automatically by __init__.
+        
+        Args:
+            model_path: Path to YOLOv8 `.pt` weights
+            calibration_data: Dataset YAML (ultralytics format) of
+                representative frames from the deployment cameras, e.g. a few
+                hundred CCTV keyframes; required for INT8 calibration
+            imgsz: Inference image size
+            int8: INT8 quantization; if False, exports FP16
+            batch: Max batch size (the engine is built with dynamic shapes so
+                it serves any batch up to this, matching `batch_size`)
+            nms: Bake NMS into the engine (EfficientNMS_TRT), so only the
+                final (max_det, 6) boxes per frame are copied back instead
+                of the raw anchor grid
+            
+        Returns:
+            Path to the exported `.engine` file
+        """
+        if int8 and not calibration_data:
+            raise ValueError(
+                "INT8 export needs calibration_data: a dataset YAML of "
+                "representative footage (or pass int8=False for FP16)"
+            )
+        model = YOLO(model_path)
+        if int8:
+            return model.export(
+                format='engine', int8=True, data=calibration_data,
+                imgsz=imgsz, dynamic=True, batch=batch, nms=nms
+            )
+        return model.export(
+            format='engine', half=True, imgsz=imgsz, dynamic=True, batch=batch, nms=nms
+        )
+    
     def _init_severity_classifier(self, model_path: Optional[str]) -> nn.Module:
         """
         Initialize severity classification model.
         Uses pre-trained MobileNetV2 or loads custom model.
         """
+        # INT8 only pays off on CPU; GPU paths use fp32/TensorRT FP16 instead
+        quantize = (self.quantize_severity and self.severity_device.type == 'cpu'
+                    and not self.use_tensorrt
+                    and torch.backends.quantized.engine in _INT8_ENGINES)
+        
         if model_path and Path(model_path).exists():
             print(f"Loading custom severity model: {model_path}")
             model = torch.load(model_path)
+            if quantize:
+                # Architecture unknown, so only its Linear layers can be
+                # quantized without calibration data
+                model = torch.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+        elif quantize:
+            print("Initializing pre-trained INT8 MobileNetV2 for severity classification")
+            model = _QuantizedSeverityMobileNetV2(num_classes=3)
         else:
             print("Initializing pre-trained MobileNetV2 for severity classification")
             model = models.mobilenet_v2(pretrained=True)
@@ -71,6 +270,62 @@ class VideoKeyframeProcessor:
         model.eval()
         return model
     
+    def _freeze_severity_classifier(self, model: nn.Module) -> nn.Module:
+        """
+        Trace and freeze the classifier into TorchScript: folds BatchNorm into
+        the convolutions and drops per-layer Python dispatch. A warm-up forward
+        runs here so the first real frame doesn't pay for optimization.
+        Falls back to the eager model if tracing fails (e.g. a custom model).
+        """
+        example = torch.zeros(1, 3, 224, 224, device=self.severity_device, dtype=self.severity_dtype)
+        try:
+            with torch.no_grad():
+                frozen = torch.jit.optimize_for_inference(
+                    torch.jit.freeze(torch.jit.trace(model.eval(), example))
+                )
+                frozen(example)
+            return frozen
+        except Exception as e:
+            print(f"TorchScript freeze of severity model failed ({e}); using eager mode")
+            return model
+    
+    def _enable_severity_tensorrt(self, model_path: Optional[str]):
+        """
+        Swap the severity classifier for an FP16 TensorRT module compiled
+        with torch_tensorrt. The compiled TorchScript is cached on disk, so
+        only the first run pays for the build.
+        """
+        try:
+            import torch_tensorrt  # noqa: F401 (also registers the TRT runtime for jit.load)
+        except ImportError:
+            print("torch_tensorrt not installed; severity model stays in PyTorch")
+            return
+        
+        cache_path = (Path(model_path).with_suffix('.trt.ts') if model_path
+                      else Path('mobilenet_v2_severity.trt.ts'))
+        try:
+            if cache_path.exists():
+                print(f"Loading severity TensorRT module: {cache_path}")
+                trt_model = torch.jit.load(str(cache_path), map_location='cuda')
+            else:
+                print("Compiling severity model with TensorRT FP16 (one-time)...")
+                model = self.severity_classifier.to('cuda').half().eval()
+                trt_model = torch_tensorrt.compile(
+                    model,
+                    ir='ts',
+                    inputs=[torch_tensorrt.Input((1, 3, 224, 224), dtype=torch.half)],
+                    enabled_precisions={torch.half}
+                )
+                torch.jit.save(trt_model, str(cache_path))
+        except Exception as e:
+            print(f"TensorRT compile of severity model failed ({e}); using PyTorch")
+            self.severity_classifier = self.severity_classifier.float()
+            return
+        
+        self.severity_classifier = trt_model
+        self.severity_device = torch.device('cuda')
+        self.severity_dtype = torch.half
+    
     def extract_keyframes(
         self, 
         video_path: str, 
@@ -86,59 +341,249 @@ class VideoKeyframeProcessor:
         Returns:
             List of dictionaries containing keyframe info
         """
+        return list(self._read_keyframes(video_path, output_dir))
+    
+    def _read_keyframes(
+        self, 
+        video_path: str, 
+        output_dir: Optional[str] = None,
+        save_keyframe: Optional[Callable[[str, np.ndarray], None]] = None,
+        interval: Optional[int] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Decode video file and yield keyframe info dicts as they are extracted.
+        
+        Keyframes are saved with `save_keyframe(image_path, frame)` when
+        output_dir is set (default: a synchronous cv2.imwrite). Keyframes are
+        the frames numbered a multiple of `interval` (default
+        self.keyframe_interval) within [start_frame, end_frame].
+        """
+        if save_keyframe is None:
+            save_keyframe = self._save_keyframe
+        interval = interval or self.keyframe_interval
         print(f"\nProcessing video: {video_path}")
-        cap = cv2.VideoCapture(video_path)
+        cap, fps, total_frames = self._open_capture(video_path)
+        
+        try:
+            duration = total_frames / fps if fps > 0 else 0
+            
+            print(f"Video properties: {total_frames} frames, {fps:.2f} FPS, {duration:.2f}s duration")
+            
+            keyframe_count = 0
+            frame_count = start_frame if start_frame and self._seek(cap, start_frame) else 0
+            
+            # Create output directory if specified
+            if output_dir:
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+            
+            # grab() advances without the BGR conversion/copy; retrieve() then
+            # materializes only the keyframes. NVDEC captures (ffmpegcv) only
+            # offer read().
+            selective = hasattr(cap, 'grab') and hasattr(cap, 'retrieve')
+            
+            while end_frame is None or frame_count <= end_frame:
+                is_keyframe = frame_count >= start_frame and frame_count % interval == 0
+                if selective:
+                    if not cap.grab():
+                        break
+                    if is_keyframe:
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            break
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                
+                # Extract keyframe at specified intervals
+                if is_keyframe:
+                    timestamp = frame_count / fps if fps > 0 else 0
+                    
+                    keyframe_info = {
+                        'frame_number': frame_count,
+                        'timestamp': timestamp,
+                        'frame': frame,
+                        'image_path': None
+                    }
+                    
+                    # Save keyframe image if output directory specified
+                    if output_dir:
+                        image_filename = f"keyframe_{frame_count:06d}.jpg"
+                        image_path = Path(output_dir) / image_filename
+                        save_keyframe(str(image_path), frame)
+                        keyframe_info['image_path'] = str(image_path)
+                    
+                    keyframe_count += 1
+                    yield keyframe_info
+                
+                frame_count += 1
+        finally:
+            cap.release()
+        
+        print(f"Extracted {keyframe_count} keyframes from {total_frames} total frames")
+    
+    @staticmethod
+    def _seek(cap, frame_number: int) -> bool:
+        """
+        Position an OpenCV capture at `frame_number`. Returns False, with the
+        capture rewound to the start, if seeking is unsupported or inexact,
+        so the caller can walk forward instead.
+        """
+        if not hasattr(cap, 'set'):
+            return False
+        if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number) and \
+                int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_number:
+            return True
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return False
+    
+    @staticmethod
+    def _save_keyframe(image_path: str, frame: np.ndarray):
+        """Write one keyframe image to disk, encoding with libjpeg-turbo if available."""
+        if _turbo_jpeg is not None:
+            with open(image_path, 'wb') as f:
+                f.write(_turbo_jpeg.encode(frame, quality=KEYFRAME_JPEG_QUALITY, pixel_format=TJPF_BGR))
+        else:
+            cv2.imwrite(image_path, frame, [cv2.IMWRITE_JPEG_QUALITY, KEYFRAME_JPEG_QUALITY])
+    
+    @staticmethod
+    def _batched(items: Iterator, size: int) -> Iterator[List]:
+        """Group an iterator into lists of up to `size` items."""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _open_capture(self, video_path: str) -> Tuple[object, float, int]:
+        """
+        Open a video for decoding, on the GPU when NVDEC is enabled.
+        
+        Returns:
+            Tuple of (capture, fps, total_frames); the capture supports
+            read() and release() like cv2.VideoCapture (grab()/retrieve()
+            only for the OpenCV backend)
+        """
+        if self.use_nvdec:
+            try:
+                cap = ffmpegcv.VideoCaptureNV(video_path, pix_fmt='bgr24')
+                return cap, float(cap.fps), int(cap.count)
+            except Exception as e:
+                print(f"NVDEC decode failed ({e}), falling back to OpenCV")
+        
+        # Ask for the FFmpeg backend explicitly (fall back to OpenCV's default
+        # choice if this build lacks it) and keep its frame buffer minimal
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
             raise ValueError(f"Unable to open video file: {video_path}")
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps if fps > 0 else 0
+        return cap, fps, total_frames
+    
+    def iter_keyframes(
+        self, 
+        video_path: str, 
+        output_dir: Optional[str] = None,
+        interval: Optional[int] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield keyframes decoded on a background reader thread.
         
-        print(f"Video properties: {total_frames} frames, {fps:.2f} FPS, {duration:.2f}s duration")
+        Decoding runs ahead of the consumer (e.g. YOLO inference) through a
+        queue bounded by `self.prefetch`, so decode and compute overlap while
+        memory stays capped. Errors raised while decoding are re-raised here.
+        When output_dir is set, keyframe images are written by a third,
+        writer thread (also bounded by `self.prefetch`), so disk I/O stalls
+        neither decoding nor inference. All images are on disk once the
+        iterator is exhausted or closed.
         
-        keyframes = []
-        frame_count = 0
+        Args:
+            video_path: Path to input video file
+            output_dir: Optional directory to save keyframe images
+            interval: Keyframe spacing in frames (default self.keyframe_interval)
+            start_frame: First frame number to consider
+            end_frame: Last frame number to consider (default: end of video)
+            
+        Yields:
+            Keyframe info dictionaries, in frame order
+        """
+        read_q = queue.Queue(maxsize=max(1, self.prefetch))
+        stop = threading.Event()
         
-        # Create output directory if specified
-        if output_dir:
-            Path(output_dir).mkdir(parents=True, exist_ok=True)
+        def put(item) -> bool:
+            # Block while the queue is full, but give up if the consumer left
+            while not stop.is_set():
+                try:
+                    read_q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Extract keyframe at specified intervals
-            if frame_count % self.keyframe_interval == 0:
-                timestamp = frame_count / fps if fps > 0 else 0
-                
-                keyframe_info = {
-                    'frame_number': frame_count,
-                    'timestamp': timestamp,
-                    'frame': frame,
-                    'image_path': None
-                }
-                
-                # Save keyframe image if output directory specified
-                if output_dir:
-                    image_filename = f"keyframe_{frame_count:06d}.jpg"
-                    image_path = Path(output_dir) / image_filename
-                    cv2.imwrite(str(image_path), frame)
-                    keyframe_info['image_path'] = str(image_path)
-                
-                keyframes.append(keyframe_info)
-            
-            frame_count += 1
+        write_q = queue.Queue(maxsize=max(1, self.prefetch))
         
-        cap.release()
-        print(f"Extracted {len(keyframes)} keyframes from {total_frames} total frames")
+        def writer():
+            while True:
+                item = write_q.get()
+                if item is _END_OF_STREAM:
+                    return
+                image_path, frame = item
+                try:
+                    self._save_keyframe(image_path, frame)
+                except Exception as e:
+                    print(f"Failed to save keyframe {image_path}: {e}")
+        
+        def reader():
+            try:
+                for keyframe_info in self._read_keyframes(
+                    video_path, output_dir,
+                    save_keyframe=lambda image_path, frame: write_q.put((image_path, frame)),
+                    interval=interval, start_frame=start_frame, end_frame=end_frame
+                ):
+                    if not put(keyframe_info):
+                        return
+            except Exception as e:
+                put(e)
+                return
+            put(_END_OF_STREAM)
+        
+        writer_thread = None
+        if output_dir:
+            writer_thread = threading.Thread(target=writer, name="keyframe-writer", daemon=True)
+            writer_thread.start()
+        reader_thread = threading.Thread(target=reader, name="keyframe-reader", daemon=True)
+        reader_thread.start()
         
-        return keyframes
+        try:
+            while True:
+                item = read_q.get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            reader_thread.join()
+            if writer_thread is not None:
+                # Reader is done, so no more writes can be queued; drain them
+                write_q.put(_END_OF_STREAM)
+                writer_thread.join()
     
-    def detect_collision(self, frame: np.ndarray) -> Tuple[bool, float, List]:
+    def detect_collision(self, frame: np.ndarray) -> Tuple[bool, float, List, Optional[np.ndarray]]:
         """
         Detect collision in a single frame using YOLOv8.
         
@@ -146,147 +591,194 @@ class VideoKeyframeProcessor:
             frame: Input frame (numpy array)
             
         Returns:
-            Tuple of (collision_detected, confidence, detections)
+            Tuple of (collision_detected, confidence, detections, iou_matrix);
+            iou_matrix is the (N, N) pairwise IoU of the detections, or None
+            if there are fewer than two
+        """
+        return self.detect_collision_batch([frame])[0]
+    
+    def detect_collision_batch(
+        self, frames: List[np.ndarray]
+    ) -> List[Tuple[bool, float, List, Optional[np.ndarray]]]:
+        """
+        Detect collisions in several frames with a single YOLOv8 call.
+        
+        Args:
+            frames: Input frames (numpy arrays)
+            
+        Returns:
+            One (collision_detected, confidence, detections, iou_matrix) tuple per frame
+        """
+        # Run inference once for the whole batch
+        results = self.collision_detector(frames, verbose=False)
+        
+        return self._detect_collision_batch(results)
+    
+    def _detect_collision_batch(
+        self, results_list: List
+    ) -> List[Tuple[bool, float, List, Optional[np.ndarray]]]:
         """
-        # Run inference
-        results = self.collision_detector(frame, verbose=False)
+        Post-process per-frame YOLOv8 Results from a batched call.
         
+        Args:
+            results_list: Output of self.collision_detector for a list of frames
+            
+        Returns:
+            One (collision_detected, confidence, detections, iou_matrix) tuple per frame
+        """
+        return [self._collision_from_results([frame_result]) for frame_result in results_list]
+    
+    def _collision_from_results(self, results: List) -> Tuple[bool, float, List, Optional[np.ndarray]]:
+        """
+        Analyze YOLOv8 results for one frame for collision indicators.
+        
+        Args:
+            results: Output of self.collision_detector for a single frame
+            
+        Returns:
+            Tuple of (collision_detected, confidence, detections, iou_matrix)
+        """
         # Analyze detections for collision indicators
         collision_detected = False
         max_confidence = 0.0
         detections = []
+        vehicle_boxes = []
         
         for result in results:
             boxes = result.boxes
             
+            # One device->host copy per tensor instead of one sync per box
+            cls_arr = boxes.cls.cpu().numpy().astype(int)
+            conf_arr = boxes.conf.cpu().numpy()
+            xyxy_arr = boxes.xyxy.cpu().numpy()
+            
             # Look for vehicles (car, truck, bus, motorcycle)
-            vehicle_classes = [2, 3, 5, 7]  # COCO class IDs for vehicles
+            vehicle_mask = np.isin(cls_arr, VEHICLE_CLASS_IDS)
+            vehicle_conf = conf_arr[vehicle_mask]
+            vehicle_xyxy = xyxy_arr[vehicle_mask]
+            vehicle_boxes.append(vehicle_xyxy)
             
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                if cls in vehicle_classes:
-                    detections.append({
-                        'class': cls,
-                        'confidence': conf,
-                        'bbox': box.xyxy[0].cpu().numpy().tolist()
-                    })
-                    
-                    # Check for collision indicators:
-                    # 1. High-confidence vehicle detections
-                    # 2. Overlapping bounding boxes (potential collision)
-                    if conf > self.collision_threshold:
-                        max_confidence = max(max_confidence, conf)
-                        collision_detected = True
-        
-        # Enhanced collision detection: check for overlapping vehicles
+            detections.extend(
+                {'class': cls, 'confidence': conf, 'bbox': bbox}
+                for cls, conf, bbox in zip(
+                    cls_arr[vehicle_mask].tolist(),
+                    vehicle_conf.tolist(),
+                    vehicle_xyxy.tolist()
+                )
+            )
+            
+            # Check for collision indicators:
+            # 1. High-confidence vehicle detections
+            # 2. Overlapping bounding boxes (potential collision)
+            confident = vehicle_conf[vehicle_conf > self.collision_threshold]
+            if confident.size:
+                max_confidence = max(max_confidence, float(confident.max()))
+                collision_detected = True
+        
+        # Enhanced collision detection: check for overlapping vehicles. The
+        # IoU matrix is returned so classify_severity doesn't recompute it
+        iou_matrix = None
         if len(detections) >= 2:
-            collision_detected = self._check_vehicle_overlap(detections) or collision_detected
+            # float64, same as the bbox lists in detections
+            iou_matrix = self._iou_matrix(np.concatenate(vehicle_boxes).astype(np.float64))
+            collision_detected = self._check_vehicle_overlap(iou_matrix) or collision_detected
         
-        return collision_detected, max_confidence, detections
+        return collision_detected, max_confidence, detections, iou_matrix
     
-    def _check_vehicle_overlap(self, detections: List[Dict]) -> bool:
+    def _check_vehicle_overlap(self, iou_matrix: np.ndarray) -> bool:
         """
         Check if vehicle bounding boxes overlap significantly (collision indicator).
         """
-        for i in range(len(detections)):
-            for j in range(i + 1, len(detections)):
-                bbox1 = detections[i]['bbox']
-                bbox2 = detections[j]['bbox']
-                
-                # Calculate IoU (Intersection over Union)
-                iou = self._calculate_iou(bbox1, bbox2)
-                
-                # High IoU suggests collision/overlap
-                if iou > 0.3:
-                    return True
-        
-        return False
+        # High IoU between any pair suggests collision/overlap
+        return self._max_iou(iou_matrix) > 0.3
     
-    def _calculate_iou(self, bbox1: List[float], bbox2: List[float]) -> float:
-        """Calculate Intersection over Union for two bounding boxes."""
-        x1_min, y1_min, x1_max, y1_max = bbox1
-        x2_min, y2_min, x2_max, y2_max = bbox2
-        
-        # Calculate intersection
-        x_inter_min = max(x1_min, x2_min)
-        y_inter_min = max(y1_min, y2_min)
-        x_inter_max = min(x1_max, x2_max)
-        y_inter_max = min(y1_max, y2_max)
-        
-        if x_inter_max < x_inter_min or y_inter_max < y_inter_min:
-            return 0.0
+    @staticmethod
+    def _iou_matrix(boxes: np.ndarray) -> np.ndarray:
+        """
+        Pairwise Intersection over Union for (N, 4) xyxy boxes, as an (N, N)
+        matrix computed by broadcasting. Pairs with zero union area get 0.
+        """
+        x_inter_min = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+        y_inter_min = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+        x_inter_max = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+        y_inter_max = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
         
-        inter_area = (x_inter_max - x_inter_min) * (y_inter_max - y_inter_min)
+        inter_area = np.clip(x_inter_max - x_inter_min, 0, None) * np.clip(y_inter_max - y_inter_min, 0, None)
         
-        # Calculate union
-        bbox1_area = (x1_max - x1_min) * (y1_max - y1_min)
-        bbox2_area = (x2_max - x2_min) * (y2_max - y2_min)
-        union_area = bbox1_area + bbox2_area - inter_area
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        union_area = areas[:, None] + areas[None, :] - inter_area
         
-        return inter_area / union_area if union_area > 0 else 0.0
+        return np.divide(inter_area, union_area, out=np.zeros_like(inter_area), where=union_area > 0)
     
-    def classify_severity(self, frame: np.ndarray, detections: List[Dict] = None) -> Tuple[str, float]:
+    @staticmethod
+    def _max_iou(iou_matrix: Optional[np.ndarray]) -> float:
+        """Largest off-diagonal entry of an IoU matrix (0.0 for None)."""
+        if iou_matrix is None:
+            return 0.0
+        return float(np.triu(iou_matrix, k=1).max())
+    
+    def classify_severity(
+        self,
+        frame: np.ndarray,
+        detections: List[Dict] = None,
+        iou_matrix: Optional[np.ndarray] = None
+    ) -> Tuple[str, float]:
         """
         Classify accident severity from frame using rule-based approach.
         
         Args:
             frame: Input frame (numpy array)
             detections: Vehicle detections from collision detection
+            iou_matrix: Pairwise IoU of detections from collision detection;
+                computed here if not given
             
         Returns:
             Tuple of (severity_class, confidence)
         """
+        # If no detections, fall back to ML model
+        if not detections:
+            return self._ml_classify_severity(frame)
+        
         # Rule-based severity assessment for hackathon speed
         severity_score = 0
-        confidence = 0.0
-        
-        if detections:
-            # Factor 1: Number of vehicles involved
-            num_vehicles = len(detections)
-            if num_vehicles >= 3:
-                severity_score += 30
-            elif num_vehicles == 2:
-                severity_score += 15
-            
-            # Factor 2: Maximum overlap (IoU) between vehicles
-            max_iou = 0.0
-            for i in range(len(detections)):
-                for j in range(i + 1, len(detections)):
-                    iou = self._calculate_iou(
-                        detections[i]['bbox'], 
-                        detections[j]['bbox']
-                    )
-                    max_iou = max(max_iou, iou)
-            
-            # High overlap = severe impact
-            if max_iou > 0.5:
-                severity_score += 40
-            elif max_iou > 0.3:
-                severity_score += 25
-            elif max_iou > 0.15:
-                severity_score += 10
-            
-            # Factor 3: Size of vehicles (larger bbox = more debris/damage)
-            total_area = 0
-            for det in detections:
-                bbox = det['bbox']
-                area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
-                total_area += area
-            
-            # Normalize by frame size
-            frame_area = frame.shape[0] * frame.shape[1]
-            area_ratio = total_area / frame_area
-            
-            if area_ratio > 0.4:
-                severity_score += 30
-            elif area_ratio > 0.25:
-                severity_score += 15
-            
-            # Calculate confidence based on detection quality
-            avg_conf = sum(d['confidence'] for d in detections) / len(detections)
-            confidence = min(0.95, avg_conf + 0.2)  # Boost confidence for rule-based
+        
+        # Factor 1: Number of vehicles involved
+        num_vehicles = len(detections)
+        if num_vehicles >= 3:
+            severity_score += 30
+        elif num_vehicles == 2:
+            severity_score += 15
+        
+        boxes = np.array([det['bbox'] for det in detections], dtype=np.float64)
+        
+        # Factor 2: Maximum overlap (IoU) between vehicles
+        if iou_matrix is None and num_vehicles >= 2:
+            iou_matrix = self._iou_matrix(boxes)
+        max_iou = self._max_iou(iou_matrix)
+        
+        # High overlap = severe impact
+        if max_iou > 0.5:
+            severity_score += 40
+        elif max_iou > 0.3:
+            severity_score += 25
+        elif max_iou > 0.15:
+            severity_score += 10
+        
+        # Factor 3: Size of vehicles (larger bbox = more debris/damage)
+        total_area = float(((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum())
+        
+        # Normalize by frame size
+        frame_area = frame.shape[0] * frame.shape[1]
+        area_ratio = total_area / frame_area
+        
+        if area_ratio > 0.4:
+            severity_score += 30
+        elif area_ratio > 0.25:
+            severity_score += 15
+        
+        # Calculate confidence based on detection quality
+        avg_conf = sum(d['confidence'] for d in detections) / len(detections)
+        confidence = min(0.95, avg_conf + 0.2)  # Boost confidence for rule-based
         
         # Map score to severity class
         if severity_score >= 60:
@@ -296,24 +788,31 @@ class VideoKeyframeProcessor:
         else:
             severity_class = "Minor"
         
-        # If no detections, fall back to ML model
-        if not detections:
-            return self._ml_classify_severity(frame)
-        
         return severity_class, confidence
     
+    def _severity_preprocess(self, frame: np.ndarray) -> torch.Tensor:
+        """
+        BGR uint8 frame -> normalized (1, 3, 224, 224) classifier input.
+        
+        Runs as tensor ops on the classifier's device instead of
+        cvtColor + PIL + torchvision transforms, so on a GPU only the raw
+        uint8 frame is copied over and every full-resolution pass
+        (channel swap, scaling, resize) happens there.
+        """
+        x = torch.from_numpy(np.ascontiguousarray(frame)).to(self.severity_device, non_blocking=True)
+        x = x.permute(2, 0, 1).flip(0).unsqueeze(0).float().div_(255)  # HWC BGR -> NCHW RGB
+        x = F.interpolate(x, size=(224, 224), mode='bilinear', align_corners=False, antialias=True)
+        x.sub_(self._severity_mean).div_(self._severity_std)
+        return x.to(self.severity_dtype)
+    
     def _ml_classify_severity(self, frame: np.ndarray) -> Tuple[str, float]:
         """
         ML-based severity classification (fallback method).
         """
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-        
-        input_tensor = self.severity_transform(pil_image).unsqueeze(0)
-        
         with torch.no_grad():
+            input_tensor = self._severity_preprocess(frame)
             outputs = self.severity_classifier(input_tensor)
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+            probabilities = torch.nn.functional.softmax(outputs.float(), dim=1)
             confidence, predicted = torch.max(probabilities, 1)
         
         severity_class = self.severity_classes[predicted.item()]
@@ -321,10 +820,106 @@ class VideoKeyframeProcessor:
         
         return severity_class, confidence_score
     
+    def _scan_keyframes(
+        self,
+        keyframe_stream: Iterator[Dict],
+        best: Dict,
+        yolo_results: Optional[List] = None,
+        stop_on_collision: bool = False,
+        skip_frame: Optional[Callable[[int], bool]] = None
+    ) -> int:
+        """
+        Run batched collision detection over a keyframe stream, updating
+        `best` in place with the highest-confidence collision seen.
+        
+        Args:
+            keyframe_stream: Keyframes from iter_keyframes; closed on return
+            best: Collision candidate dict (see process_video)
+            yolo_results: If given, (frame_number, Results) pairs are appended
+                to it; see _preview_yolo_results for which keep their image
+            stop_on_collision: Stop after the first batch with a collision
+            skip_frame: Predicate on frame_number for keyframes to skip
+            
+        Returns:
+            Number of keyframes analyzed
+        """
+        analyzed = 0
+        keyframes = keyframe_stream
+        if skip_frame is not None:
+            keyframes = (kf for kf in keyframe_stream if not skip_frame(kf['frame_number']))
+        
+        try:
+            for batch in self._batched(keyframes, self.batch_size):
+                # One inference call per batch amortizes per-call/launch overhead
+                batch_results = self.collision_detector(
+                    [kf['frame'] for kf in batch], verbose=False
+                )
+                batch_collisions = self._detect_collision_batch(batch_results)
+                
+                for keyframe_info, frame_result, (detected, confidence, detections, iou_matrix) in zip(
+                    batch, batch_results, batch_collisions
+                ):
+                    analyzed += 1
+                    frame = keyframe_info.pop('frame')
+                    
+                    if yolo_results is not None:
+                        # Results hold the full decoded frame as orig_img.
+                        # Keep it only on the first three and the latest
+                        # entries so memory stays flat over long clips
+                        if len(yolo_results) > 3:
+                            yolo_results[-1][1].orig_img = None
+                        yolo_results.append((keyframe_info['frame_number'], frame_result))
+                    
+                    if detected:
+                        # Keep track of highest confidence collision
+                        if confidence > best['confidence']:
+                            best['frame_number'] = keyframe_info['frame_number']
+                            best['timestamp'] = keyframe_info['timestamp']
+                            best['confidence'] = confidence
+                            best['detections'] = detections
+                            best['iou_matrix'] = iou_matrix
+                            best['image'] = frame
+                            
+                            print(f"  Frame {keyframe_info['frame_number']}: "
+                                  f"COLLISION DETECTED (confidence: {confidence:.3f})")
+                
+                if stop_on_collision and best['frame_number'] is not None:
+                    break
+        finally:
+            # Stops the reader (and drains the writer) if we broke out early
+            keyframe_stream.close()
+        
+        return analyzed
+    
+    def _preview_yolo_results(self, video_path: str, entries: List[Tuple[int, object]]) -> List:
+        """
+        Finalize the (frame_number, Results) pairs collected by _scan_keyframes.
+        
+        Only the Results that video_analyzer.analyze_frames draws (all of
+        them for up to three keyframes, otherwise first, middle and last)
+        keep orig_img; the rest carry just their boxes for counting. The
+        middle keyframe's frame was dropped during the scan, so that one
+        frame is decoded again.
+        """
+        n = len(entries)
+        preview = {0, n // 2, n - 1} if n > 3 else set(range(n))
+        
+        for index, (frame_number, frame_result) in enumerate(entries):
+            if index not in preview:
+                frame_result.orig_img = None
+            elif frame_result.orig_img is None:
+                for keyframe_info in self._read_keyframes(
+                    video_path, interval=1, start_frame=frame_number, end_frame=frame_number
+                ):
+                    frame_result.orig_img = keyframe_info['frame']
+        
+        return [frame_result for _, frame_result in entries]
+    
     def process_video(
         self, 
         video_path: str,
-        output_dir: Optional[str] = None
+        output_dir: Optional[str] = None,
+        keep_yolo_results: bool = False
     ) -> Dict:
         """
         Complete video processing pipeline.
@@ -332,6 +927,15 @@ class VideoKeyframeProcessor:
         Args:
             video_path: Path to input video file
             output_dir: Optional directory for saving keyframes
+            keep_yolo_results: If True, add the raw YOLOv8 Results for every
+                keyframe under 'yolo_results' so callers can reuse them
+                (e.g. video_analyzer.analyze_frames) instead of decoding the
+                video again. Only the first, middle and last keep their
+                frame (orig_img). These are not JSON serializable. In frame
+                order; with coarse_stride > 1 they only cover the keyframes
+                that were analyzed (the coarse probes up to the first
+                collision, plus the refine window around it), so object
+                counts derived from them miss the rest of the clip.
             
         Returns:
             Dictionary containing processing results
@@ -340,57 +944,70 @@ class VideoKeyframeProcessor:
         print("VIDEO KEYFRAME PROCESSOR - STARTING ANALYSIS")
         print("="*60)
         
-        # Extract keyframes
-        keyframes = self.extract_keyframes(video_path, output_dir)
+        # Best collision candidate so far; only its image is kept, frames are
+        # dropped once inferred so memory doesn't grow with clip length
+        best = {
+            'frame_number': None,
+            'timestamp': None,
+            'confidence': 0.0,
+            'detections': None,
+            'iou_matrix': None,
+            'image': None
+        }
+        yolo_results = [] if keep_yolo_results else None
+        
+        if self.coarse_stride == 1:
+            keyframe_count = self._scan_keyframes(
+                self.iter_keyframes(video_path, output_dir), best, yolo_results
+            )
+        else:
+            # Coarse pass: every coarse_stride-th keyframe, until a collision
+            coarse_interval = self.keyframe_interval * self.coarse_stride
+            keyframe_count = self._scan_keyframes(
+                self.iter_keyframes(video_path, output_dir, interval=coarse_interval),
+                best, yolo_results, stop_on_collision=True
+            )
+            if best['frame_number'] is not None:
+                # Refine: the keyframes within one coarse step either side of
+                # the hit, skipping the already-inferred coarse probe
+                hit = best['frame_number']
+                keyframe_count += self._scan_keyframes(
+                    self.iter_keyframes(
+                        video_path, output_dir,
+                        start_frame=max(0, hit - coarse_interval + 1),
+                        end_frame=hit + coarse_interval - 1
+                    ),
+                    best, yolo_results,
+                    skip_frame=lambda frame_number: frame_number % coarse_interval == 0
+                )
         
-        if not keyframes:
+        collision_frame = best['frame_number']
+        collision_timestamp = best['timestamp']
+        collision_confidence = best['confidence']
+        
+        if not keyframe_count:
             return {
                 'collision_detected': False,
                 'error': 'No keyframes extracted from video'
             }
         
-        # Analyze each keyframe for collision
-        collision_frame = None
-        collision_timestamp = None
-        collision_confidence = 0.0
-        
-        print(f"\nAnalyzing {len(keyframes)} keyframes for collision detection...")
-        
-        for idx, keyframe_info in enumerate(keyframes):
-            frame = keyframe_info['frame']
-            detected, confidence, detections = self.detect_collision(frame)
-            
-            if detected:
-                # Keep track of highest confidence collision
-                if confidence > collision_confidence:
-                    collision_frame = keyframe_info['frame_number']
-                    collision_timestamp = keyframe_info['timestamp']
-                    collision_confidence = confidence
-
-                    print(f"  Frame {keyframe_info['frame_number']}: "
-                      f"COLLISION DETECTED (confidence: {confidence:.3f})")
+        print(f"\nAnalyzed {keyframe_count} keyframes for collision detection")
         
         # If collision detected, classify severity
         severity_actual = None
         severity_confidence = 0.0
-        collision_detections = None
         
         if collision_frame is not None:
             print(f"\nCollision detected at frame {collision_frame} "
                   f"(timestamp: {collision_timestamp:.2f}s)")
             
-            # Find the collision keyframe and re-run detection for severity analysis
-            collision_keyframe = next(
-                kf for kf in keyframes if kf['frame_number'] == collision_frame
-            )
-            
-            # Get detections for severity classification
-            _, _, collision_detections = self.detect_collision(collision_keyframe['frame'])
-            
-            # Classify severity with detection context
+            # Classify severity with detection context; the collision frame's
+            # detections and IoU matrix were kept from the batched pass, so
+            # neither YOLO nor the IoU computation runs on it a second time
             severity_actual, severity_confidence = self.classify_severity(
-                collision_keyframe['frame'],
-                detections=collision_detections
+                best['image'],
+                detections=best['detections'],
+                iou_matrix=best['iou_matrix']
             )
             
             print(f"Severity classification: {severity_actual} "
@@ -405,7 +1022,7 @@ class VideoKeyframeProcessor:
             'collision_confidence': collision_confidence,
             'severity_actual': severity_actual,
             'severity_confidence': severity_confidence,
-            'total_keyframes': len(keyframes),
+            'total_keyframes': keyframe_count,
             'keyframe_interval': self.keyframe_interval
         }
         
@@ -414,6 +1031,12 @@ class VideoKeyframeProcessor:
         print("="*60)
         print(f"Results: {json.dumps(result, indent=2)}")
         
+        if keep_yolo_results:
+            # The refine pass appends keyframes before the hit after the
+            # coarse ones; previews and callers expect frame order
+            yolo_results.sort(key=lambda entry: entry[0])
+            result['yolo_results'] = self._preview_yolo_results(video_path, yolo_results)
+        
         return result
     
     def export_results(self, results: Dict, output_path: str):